@@ -0,0 +1,139 @@
+"""结构化 JSON 访问日志（Cloud Logging 格式），附带每个请求的耗时拆分。
+
+请求线程只把字典放进有界队列，从不写 stdout；后台线程批量序列化并写出。
+队列满时直接丢弃并计数（helloworld_access_log_dropped_total），日志永远不阻塞 worker。
+"""
+
+import atexit
+import contextlib
+import contextvars
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+import metrics
+
+_DROPPED = metrics.ACCESS_LOG_DROPPED.labels()
+_timings = contextvars.ContextVar("accesslog_timings", default=None)
+
+
+def begin():
+    """开始记录当前请求的耗时拆分（毫秒），返回该请求的字典。"""
+    timings = {}
+    _timings.set(timings)
+    return timings
+
+
+def add(name, seconds):
+    timings = _timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds * 1000
+
+
+@contextlib.contextmanager
+def timed(name):
+    """把代码块耗时累加到当前请求的 name 项上。"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add(name, time.perf_counter() - start)
+
+
+def entry(method, url, status, seconds, timings, headers, size=None, remote=None):
+    """按 Cloud Logging 的 httpRequest 结构组装一条访问日志。"""
+    timings["total"] = seconds * 1000
+    record = {
+        "severity": "ERROR" if status >= 500 else "INFO",
+        "httpRequest": {
+            "requestMethod": method,
+            "requestUrl": url,
+            "status": status,
+            "latency": f"{seconds:.6f}s",
+            "userAgent": headers.get("User-Agent"),
+            "remoteIp": _client_ip(headers.get("X-Forwarded-For")) or remote,
+        },
+        "timings_ms": {k: round(v, 3) for k, v in timings.items()},
+    }
+    if size is not None:
+        record["httpRequest"]["responseSize"] = str(size)
+    trace = headers.get("X-Cloud-Trace-Context")
+    project = os.environ.get("GOOGLE_CLOUD_PROJECT")
+    if trace and project:
+        record["logging.googleapis.com/trace"] = (
+            f"projects/{project}/traces/{trace.split('/', 1)[0]}"
+        )
+    return record
+
+
+def _client_ip(forwarded_for):
+    # Cloud Run 前端会追加 X-Forwarded-For，第一个地址是原始客户端
+    if forwarded_for:
+        return forwarded_for.split(",", 1)[0].strip()
+    return None
+
+
+class AccessLog:
+    """有界队列 + 后台写线程；线程不能跨 fork 继承，每个进程首次 emit 时各自启动。"""
+
+    def __init__(self, stream=None, max_queue=10000, batch=256):
+        self._stream = stream
+        self._queue = queue.Queue(max_queue)
+        self._batch = batch
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def dropped(self):
+        return int(_DROPPED.totals()[0])
+
+    def emit(self, record):
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            _DROPPED.inc()
+
+    def flush(self, timeout=1.0):
+        """等待队列写空（进程退出前调用），最多 timeout 秒。"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def _ensure_writer(self):
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            threading.Thread(target=self._run, name="access-log", daemon=True).start()
+            self._pid = pid
+
+    def _run(self):
+        q = self._queue
+        while True:
+            records = [q.get()]
+            while len(records) < self._batch:
+                try:
+                    records.append(q.get_nowait())
+                except queue.Empty:
+                    break
+            stream = self._stream or sys.stdout
+            try:
+                stream.write(
+                    "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+                )
+                stream.flush()
+            except Exception:
+                pass
+            finally:
+                for _ in records:
+                    q.task_done()
+
+
+LOG = AccessLog(max_queue=int(os.environ.get("ACCESS_LOG_QUEUE", "10000")))
+atexit.register(LOG.flush)
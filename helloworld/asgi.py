@@ -0,0 +1,408 @@
+"""ASGI 入口：提供与 main.py 相同的路由（/、/whoami、/healthz、/readyz、/metrics）。
+
+metadata 访问走 httpx.AsyncClient（keep-alive 连接池），等待上游时只挂起协程，
+不占用 worker 线程，单进程即可承载大量并发请求。
+ADC 仍由 identity.CredentialsManager 在后台线程刷新，事件循环上不做阻塞 I/O。
+
+运行：
+    uvicorn asgi:app --host 0.0.0.0 --port 8080
+"""
+
+import asyncio
+import contextlib
+import os
+import sys
+import time
+
+import httpx
+import starlette
+from starlette.applications import Starlette
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+from starlette.routing import Route
+from werkzeug.http import parse_accept_header, parse_etags
+
+import accesslog
+import breaker
+import compression
+import identity
+import metrics
+import page
+import views
+from breaker import Deadline
+
+_INDEX = page.INDEX.bind(
+    python_version=sys.version.split(" ")[0],
+    flask_version=f"- (ASGI, Starlette {starlette.__version__})",
+)
+_compressed = compression.CompressionCache(
+    max_bytes=int(os.environ.get("COMPRESSION_CACHE_BYTES", 4 * 1024 * 1024))
+)
+_NO_STORE = {"Cache-Control": "no-store"}
+_ACCESS_LOG = os.environ.get("ACCESS_LOG", "1") == "1"
+_UPSTREAM_DEADLINE = float(os.environ.get("UPSTREAM_DEADLINE", 5))
+_COLD_START_WAIT = float(os.environ.get("COLD_START_WAIT", 1))
+_METADATA_UPSTREAM = metrics.UPSTREAM_LATENCY.labels("metadata_sa_email")
+_RENDER_INDEX = metrics.RENDER_LATENCY.labels("/")
+
+
+class AsyncMetadataClient:
+    """metadata server 的异步客户端，复用 keep-alive 连接。"""
+
+    def __init__(self, max_connections=100, max_keepalive=20):
+        self._client = httpx.AsyncClient(
+            base_url=identity.METADATA_ROOT,
+            headers=identity.METADATA_HEADERS,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive,
+            ),
+            trust_env=False,
+        )
+        self._available = None
+
+    async def available(self, timeout=0.5):
+        if self._available is None:
+            try:
+                resp = await self._client.get("", timeout=timeout)
+                self._available = resp.headers.get("Metadata-Flavor") == "Google"
+            except httpx.HTTPError:
+                self._available = False
+        return self._available
+
+    async def get_text(self, path, timeout):
+        resp = await self._client.get(path, timeout=timeout)
+        resp.raise_for_status()
+        return resp.text.strip()
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+class AsyncTTLCache:
+    """identity.TTLCache 的 asyncio 版本：后台 task 提前刷新，get() 从不等待。"""
+
+    def __init__(
+        self,
+        loader,
+        ttl=300.0,
+        refresh_ahead=30.0,
+        negative_ttl=10.0,
+        available=None,
+        breaker=None,
+        deadline=5.0,
+    ):
+        self._loader = loader
+        self._available = available
+        self._breaker = breaker
+        self.deadline = deadline
+        self.ttl = ttl
+        self.refresh_ahead = min(refresh_ahead, ttl / 2)
+        self.negative_ttl = negative_ttl
+        self._value = None
+        self._expires_at = 0.0
+        self._refresh_at = 0.0
+        self._disabled = False
+        self._failing = False
+        # Event / Lock 在运行中的事件循环里第一次用到时才创建：
+        # Python 3.9 的 asyncio 原语在构造时绑定默认循环，模块导入时创建会绑错循环
+        self._loaded = None
+        self._lock = None
+        self._task = None
+
+    def _event(self):
+        if self._loaded is None:
+            self._loaded = asyncio.Event()
+        return self._loaded
+
+    def _mutex(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    @property
+    def loaded(self):
+        return self._loaded is not None and self._loaded.is_set()
+
+    @property
+    def status(self):
+        if not self.loaded:
+            return "pending"
+        if self._disabled:
+            return "disabled"
+        if self._breaker is not None and self._breaker.is_open:
+            return "open"
+        return "failing" if self._failing else "ok"
+
+    def get(self):
+        if self._value is not None and self._expires_at <= time.monotonic():
+            if self._breaker is None or not self._breaker.is_open:
+                return None
+        return self._value
+
+    async def wait(self):
+        await self._event().wait()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def refresh(self, deadline=None):
+        async with self._mutex():
+            if self._disabled or (self._available and not await self._available()):
+                self._disabled = True
+                self._event().set()
+                return None
+            breaker = self._breaker
+            if breaker is not None and not breaker.allow():
+                self._failing = True
+                self._refresh_at = time.monotonic() + max(breaker.retry_in(), 1.0)
+                self._event().set()
+                return self._value
+            deadline = deadline or Deadline(self.deadline)
+            try:
+                value = await self._loader(timeout=deadline.timeout())
+            except Exception:
+                value = None
+            if breaker is not None:
+                if value is None:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+            now = time.monotonic()
+            self._failing = value is None
+            if value is not None:
+                self._value = value
+                self._expires_at = now + self.ttl
+                self._refresh_at = self._expires_at - self.refresh_ahead
+            else:
+                if self._expires_at <= now and not (breaker and breaker.is_open):
+                    self._value = None
+                self._refresh_at = now + self.negative_ttl
+            self._event().set()
+        return self._value
+
+    async def _run(self):
+        while not self._disabled:
+            delay = self._refresh_at - time.monotonic()
+            if self.loaded and delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            await self.refresh()
+
+
+_client = None
+
+
+async def _metadata_sa_email(timeout=5):
+    start = time.perf_counter()
+    try:
+        return await _client.get_text(
+            "instance/service-accounts/default/email", timeout=timeout
+        )
+    except httpx.HTTPError:
+        return None
+    finally:
+        _METADATA_UPSTREAM.observe(time.perf_counter() - start)
+
+
+async def _metadata_available():
+    return await _client.available()
+
+
+_sa_email_cache = AsyncTTLCache(
+    _metadata_sa_email,
+    ttl=float(os.environ.get("SA_EMAIL_TTL", 300)),
+    negative_ttl=float(os.environ.get("SA_EMAIL_NEGATIVE_TTL", 10)),
+    available=_metadata_available,
+    breaker=breaker.from_env("metadata"),
+    deadline=_UPSTREAM_DEADLINE,
+)
+_credentials = identity.CredentialsManager(
+    refresh_margin=float(os.environ.get("ADC_REFRESH_MARGIN", 300)),
+    breaker=breaker.from_env("adc"),
+    deadline=_UPSTREAM_DEADLINE,
+)
+_credentials_waiter = None
+
+
+def _wait_credentials():
+    """把 CredentialsManager 的线程事件桥接成所有请求共享的一个 asyncio 任务。"""
+    global _credentials_waiter
+    waiter = _credentials_waiter
+    # 上一次等待超时结束而凭证仍未加载时重新等待，否则之后的冷请求会直接拿到已完成的任务
+    if waiter is None or (waiter.done() and not _credentials.loaded):
+        _credentials_waiter = asyncio.ensure_future(
+            asyncio.to_thread(_credentials.wait, _UPSTREAM_DEADLINE)
+        )
+    return asyncio.shield(_credentials_waiter)
+
+
+async def _resolve_identity():
+    """身份源尚未加载时并发等待，最多 COLD_START_WAIT 秒；加载完成后只检查标志位。"""
+    _credentials.start()
+    if _COLD_START_WAIT <= 0 or (_sa_email_cache.loaded and _credentials.loaded):
+        return
+    with contextlib.suppress(asyncio.TimeoutError):
+        await asyncio.wait_for(
+            asyncio.gather(
+                _timed_wait("metadata", _sa_email_cache.wait()),
+                _timed_wait("adc", _wait_credentials()),
+            ),
+            _COLD_START_WAIT,
+        )
+
+
+async def _timed_wait(name, awaitable):
+    start = time.perf_counter()
+    try:
+        await awaitable
+    finally:
+        accesslog.add(name, time.perf_counter() - start)
+
+
+async def _identity():
+    """返回 (ADC 快照, metadata SA 邮箱)，各自的读取耗时计入访问日志。"""
+    await _resolve_identity()
+    with accesslog.timed("adc"):
+        creds = _credentials.snapshot()
+    with accesslog.timed("metadata"):
+        sa_meta = _sa_email_cache.get()
+    return creds, sa_meta
+
+
+async def hello_world(request):
+    values = views.index_values(*await _identity())
+    etag = _INDEX.etag(values)
+    encoding = compression.negotiate(
+        parse_accept_header(request.headers.get("accept-encoding"))
+    )
+    headers = {"Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if parse_etags(request.headers.get("if-none-match")).contains_weak(etag):
+        headers["ETag"] = f'"{etag}"' if encoding is None else f'W/"{etag}"'
+        return Response(status_code=304, headers=headers)
+    start = time.perf_counter()
+    with accesslog.timed("render"):
+        if encoding is not None:
+            body = _compressed.get(
+                etag, encoding, lambda: views.render_index(_INDEX, values, encoding)
+            )
+            headers["Content-Encoding"] = encoding
+            headers["ETag"] = f'W/"{etag}"'
+        else:
+            body = _INDEX.render(values)
+            headers["ETag"] = f'"{etag}"'
+    _RENDER_INDEX.observe(time.perf_counter() - start)
+    return Response(body, media_type="text/html", headers=headers)
+
+
+async def who_am_i(request):
+    return JSONResponse(views.whoami_body(*await _identity()))
+
+
+async def healthz(request):
+    return PlainTextResponse("ok\n", headers=_NO_STORE)
+
+
+async def readyz(request):
+    _credentials.start()
+    upstreams = {"metadata": _sa_email_cache.status, "adc": _credentials.status}
+    body, code = views.readiness(upstreams)
+    return JSONResponse(body, status_code=code, headers=_NO_STORE)
+
+
+async def prometheus_metrics(request):
+    return Response(metrics.render(), headers={"Content-Type": metrics.CONTENT_TYPE})
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    """启动时并发预热 metadata 邮箱和 ADC（共享一个截止时间），再开始接收请求。"""
+    global _client
+    _client = AsyncMetadataClient(
+        max_connections=int(os.environ.get("METADATA_MAX_CONNECTIONS", 100))
+    )
+    deadline = Deadline(_UPSTREAM_DEADLINE)
+    await asyncio.gather(
+        _sa_email_cache.refresh(deadline),
+        asyncio.to_thread(_credentials.warmup, deadline=deadline),
+    )
+    _sa_email_cache.start()
+    _credentials.start()
+    try:
+        yield
+    finally:
+        await _sa_email_cache.stop()
+        await _client.aclose()
+
+
+class _MetricsMiddleware:
+    """按路由记录延迟、在途请求数和访问日志，对应 main.py 的请求钩子。"""
+
+    def __init__(self, app, routes):
+        self.app = app
+        self.routes = frozenset(routes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        route = scope["path"] if scope["path"] in self.routes else "<unmatched>"
+        in_flight = metrics.REQUESTS_IN_FLIGHT.labels(route)
+        in_flight.inc()
+        timings = accesslog.begin()
+        response = {"status": 500, "size": 0}
+
+        async def send_and_record(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                response["size"] += len(message.get("body", b""))
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_and_record)
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.REQUEST_LATENCY.labels(route).observe(elapsed)
+            in_flight.dec()
+            if _ACCESS_LOG:
+                self._log(scope, response, elapsed, timings)
+
+    @staticmethod
+    def _log(scope, response, elapsed, timings):
+        headers = Headers(scope=scope)
+        url = scope["path"]
+        if scope["query_string"]:
+            url += "?" + scope["query_string"].decode("latin-1")
+        accesslog.LOG.emit(
+            accesslog.entry(
+                scope["method"],
+                url,
+                response["status"],
+                elapsed,
+                timings,
+                headers,
+                response["size"],
+                scope["client"][0] if scope.get("client") else None,
+            )
+        )
+
+
+_routes = [
+    Route("/", hello_world),
+    Route("/whoami", who_am_i),
+    Route("/healthz", healthz),
+    Route("/readyz", readyz),
+    Route("/metrics", prometheus_metrics),
+]
+app = _MetricsMiddleware(
+    Starlette(routes=_routes, lifespan=lifespan), [r.path for r in _routes]
+)
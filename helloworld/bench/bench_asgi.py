@@ -0,0 +1,97 @@
+"""负载对比：同步 gunicorn（WSGI）vs uvicorn（ASGI），均为单进程。
+
+两种服务都连接本地 metadata 替身（bench/fake_metadata.py，可注入延迟），
+以固定并发持续请求 / 和 /whoami，输出吞吐与延迟分位数。
+同步 worker 每个请求独占 worker 线程，并发越高排队越明显；ASGI 在同一进程内挂起协程。
+
+用法（在 helloworld/ 目录下）：
+    python bench/bench_asgi.py [--concurrency 200] [--duration 5] [--latency 0.05]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(HERE)
+sys.path.insert(0, HERE)
+
+import loadgen  # noqa: E402
+from bench_cold_start import base_env, free_port, wait_for  # noqa: E402
+from fake_metadata import SA_EMAIL, FakeMetadataServer  # noqa: E402
+
+SERVERS = {
+    "gunicorn sync": lambda port: [
+        sys.executable,
+        "-m",
+        "gunicorn",
+        "-c",
+        "gunicorn.conf.py",
+    ],
+    "uvicorn asgi": lambda port: [
+        sys.executable,
+        "-m",
+        "uvicorn",
+        "asgi:app",
+        "--port",
+        str(port),
+        "--no-access-log",
+        "--log-level",
+        "warning",
+    ],
+}
+
+
+def bench_server(label, env, paths, args):
+    port = free_port()
+    proc = subprocess.Popen(
+        SERVERS[label](port),
+        cwd=APP_DIR,
+        env={**env, "PORT": str(port)},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    try:
+        wait_for(base + "/whoami", lambda body: SA_EMAIL in body, time.monotonic() + 60)
+        return {
+            path: loadgen.run(base + path, args.concurrency, args.duration)
+            for path in paths
+        }
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    server = FakeMetadataServer(latency=args.latency).start()
+    env = base_env(server, workers=1)
+    env["GUNICORN_THREADS"] = "1"
+    paths = ("/", "/whoami")
+    print(
+        f"concurrency={args.concurrency} duration={args.duration}s "
+        f"metadata latency={args.latency * 1000:.0f} ms\n"
+    )
+    print(
+        f"{'服务':<16}{'路由':<10}{'RPS':>10}{'p50 ms':>10}"
+        f"{'p99 ms':>10}{'错误':>8}"
+    )
+    for label in SERVERS:
+        for path, r in bench_server(label, env, paths, args).items():
+            print(
+                f"{label:<16}{path:<10}{r['rps']:>10.0f}{r['p50_ms']:>10.1f}"
+                f"{r['p99_ms']:>10.1f}{r['errors']:>8}"
+            )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""冷启动基准：对比 gunicorn 预热（preload）与否的首字节时间。
+
+对每种模式启动若干次 gunicorn，统计：
+- 首字节：进程启动到 GET / 返回第一个响应的时间；
+- 身份就绪：进程启动到首页里出现 metadata SA 邮箱的时间；
+- 上游调用：该次启动期间 metadata server 收到的请求数。
+metadata server 用本地替身（bench/fake_metadata.py），可注入延迟。
+
+用法（在 helloworld/ 目录下）：
+    python bench/bench_cold_start.py [--runs 5] [--workers 2] [--latency 0.1]
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(HERE)
+sys.path.insert(0, HERE)
+
+from fake_metadata import SA_EMAIL, FakeMetadataServer  # noqa: E402
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_gunicorn(port, env, extra_args=()):
+    return subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", *extra_args],
+        cwd=APP_DIR,
+        env={**env, "PORT": str(port)},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_for(url, predicate, deadline):
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as resp:
+                body = resp.read().decode()
+            if predicate(body):
+                return time.monotonic()
+        except OSError:
+            pass
+        time.sleep(0.005)
+    raise TimeoutError(url)
+
+
+def measure(server, env, timeout=60, settle=2.0):
+    calls_before = sum(server.counts.values())
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/"
+    start = time.monotonic()
+    proc = start_gunicorn(port, env)
+    try:
+        first_byte = wait_for(url, lambda body: True, start + timeout)
+        identity = wait_for(url, lambda body: SA_EMAIL in body, start + timeout)
+        # 给其它 worker 留出时间完成各自的启动期上游调用，再统计次数
+        time.sleep(settle)
+    finally:
+        proc.terminate()
+        proc.wait()
+    calls = sum(server.counts.values()) - calls_before
+    return first_byte - start, identity - start, calls
+
+
+def base_env(server, workers):
+    env = {
+        k: v
+        for k, v in os.environ.items()
+        if k not in ("GOOGLE_APPLICATION_CREDENTIALS", "K_SERVICE")
+    }
+    env.update(server.env())
+    env["WEB_CONCURRENCY"] = str(workers)
+    # 避免读到开发机上 gcloud 登录生成的用户凭证
+    env["CLOUDSDK_CONFIG"] = os.path.join(HERE, ".no-gcloud-config")
+    return env
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=0.1)
+    args = parser.parse_args()
+
+    server = FakeMetadataServer(latency=args.latency).start()
+    env = base_env(server, args.workers)
+    print(f"workers={args.workers} metadata latency={args.latency}s runs={args.runs}\n")
+    print(f"{'模式':<12}{'首字节 ms':>12}{'身份就绪 ms':>14}{'上游调用':>10}")
+    for label, preload in (("no preload", "0"), ("preload", "1")):
+        results = [
+            measure(server, {**env, "PRELOAD": preload}) for _ in range(args.runs)
+        ]
+        ttfb = statistics.median(r[0] for r in results) * 1000
+        ready = statistics.median(r[1] for r in results) * 1000
+        calls = statistics.median(r[2] for r in results)
+        print(f"{label:<12}{ttfb:>12.1f}{ready:>14.1f}{calls:>10}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""对比首页在不同压缩方式下的传输字节数和每请求 CPU 时间。
+
+用法（在 helloworld/ 目录下）：
+    python bench/bench_compression.py [-n 2000]
+"""
+
+import argparse
+import gzip
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import compression  # noqa: E402
+import main  # noqa: E402
+
+
+def _cpu_per_call(fn, n):
+    fn()
+    start = time.process_time()
+    for _ in range(n):
+        fn()
+    return (time.process_time() - start) / n * 1e6
+
+
+def run(n):
+    client = main.app.test_client()
+    plain = client.get("/").data
+
+    def request_with(accept):
+        headers = {"Accept-Encoding": accept} if accept else {}
+        return lambda: client.get("/", headers=headers).data
+
+    values = {
+        "name": "World",
+        "server": "dev",
+        "service": "-",
+        "revision": "-",
+        "project_id": "-",
+        "sa_meta": "-",
+        "sa_adc": "-",
+        "cred_valid": "False",
+    }
+    rows = [
+        ("identity (未压缩)", len(plain), request_with(None)),
+        (
+            "gzip 每次整页压缩",
+            len(gzip.compress(plain, compression.GZIP_LEVEL)),
+            lambda: gzip.compress(main._INDEX.render(values).encode()),
+        ),
+        (
+            "gzip 拼接预压缩片段",
+            len(main._INDEX.render_gzip(values)),
+            lambda: main._INDEX.render_gzip(values),
+        ),
+        ("gzip 请求 (LRU)", len(request_with("gzip")()), request_with("gzip")),
+    ]
+    if "br" in compression.ENCODINGS:
+        rows.append(("br 请求 (LRU)", len(request_with("br")()), request_with("br")))
+
+    print(f"{'方式':<24}{'字节':>8}{'压缩比':>8}{'CPU µs/次':>12}")
+    for label, size, fn in rows:
+        cpu = _cpu_per_call(fn, n)
+        print(f"{label:<24}{size:>8}{size / len(plain):>8.2f}{cpu:>12.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", type=int, default=2000, help="每种方式的请求次数")
+    run(parser.parse_args().n)
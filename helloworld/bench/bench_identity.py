@@ -0,0 +1,75 @@
+"""身份解析微基准：串行 vs 并发（共享线程池）。
+
+metadata server 用本地替身并注入固定延迟。串行时总耗时约等于各身份源之和，
+并发时应接近最慢的那一个（ADC 解析本身包含 ping / project-id / token 等多次往返）。
+
+用法（在 helloworld/ 目录下）：
+    python bench/bench_identity.py [--latency 0.05] [--runs 5]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+from fake_metadata import FakeMetadataServer  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    server = FakeMetadataServer(latency=args.latency).start()
+    # identity / google-auth 在导入时读取 metadata 地址，必须先设置环境变量
+    os.environ.update(server.env())
+    os.environ.pop("GOOGLE_APPLICATION_CREDENTIALS", None)
+    os.environ["CLOUDSDK_CONFIG"] = os.path.join(HERE, ".no-gcloud-config")
+
+    import identity
+    from breaker import Deadline
+
+    import main as app_main
+
+    def fresh_sources():
+        identity._metadata_available = None
+        cache = identity.TTLCache(
+            app_main._metadata_sa_email,
+            available=identity.metadata_server_available,
+        )
+        return cache, identity.CredentialsManager()
+
+    def sequential():
+        cache, creds = fresh_sources()
+        cache.warmup()
+        creds.warmup()
+        assert cache.get() and creds.snapshot().error is None
+
+    def concurrent():
+        cache, creds = fresh_sources()
+        identity.resolve_all([cache, creds], Deadline(30))
+        assert cache.get() and creds.snapshot().error is None
+
+    print(f"metadata latency={args.latency * 1000:.0f} ms runs={args.runs}\n")
+    print(f"{'方式':<10}{'中位数 ms':>12}{'上游调用':>10}")
+    for label, fn in (("串行", sequential), ("并发", concurrent)):
+        fn()  # 预热导入
+        samples = []
+        before = sum(server.counts.values())
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - start)
+        calls = (sum(server.counts.values()) - before) / args.runs
+        print(f"{label:<10}{statistics.median(samples) * 1000:>12.1f}{calls:>10.1f}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""/objects 流式代理基准：不同大小对象下的吞吐与 worker 峰值内存。
+
+GCS 用本地替身（bench/fake_gcs.py，合成数据不占内存），应用跑在单 worker 的 gunicorn。
+每个大小下载一次完整对象并校验内容，同时记录 worker 的峰值 RSS（VmHWM，每轮前清零）。
+流式转发时峰值 RSS 应与对象大小无关，只随 OBJECTS_CHUNK_BYTES 变化。
+
+用法（在 helloworld/ 目录下）：
+    python bench/bench_objects.py [--sizes 16,128,512] [--chunk 1048576]
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import time
+import urllib.request
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+from bench_cold_start import base_env, free_port, start_gunicorn, wait_for  # noqa: E402
+from fake_gcs import FakeGCSServer, synthetic_bytes  # noqa: E402
+from fake_metadata import FakeMetadataServer  # noqa: E402
+
+MIB = 1024 * 1024
+
+
+def worker_pids(master):
+    with open(f"/proc/{master}/task/{master}/children") as f:
+        return [int(pid) for pid in f.read().split()]
+
+
+def peak_rss_mib(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def reset_peak(pid):
+    # 写入 5 把 VmHWM 重置为当前 RSS
+    with open(f"/proc/{pid}/clear_refs", "w") as f:
+        f.write("5")
+
+
+def expected_digest(size):
+    digest = hashlib.sha256()
+    for offset in range(0, size, 4 * MIB):
+        digest.update(synthetic_bytes(offset, min(offset + 4 * MIB, size)))
+    return digest.hexdigest()
+
+
+def download(url):
+    digest = hashlib.sha256()
+    total = 0
+    start = time.perf_counter()
+    with urllib.request.urlopen(url, timeout=120) as resp:
+        while True:
+            block = resp.read(256 * 1024)
+            if not block:
+                break
+            digest.update(block)
+            total += len(block)
+    return total, time.perf_counter() - start, digest.hexdigest()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="16,128,512", help="对象大小（MiB）")
+    parser.add_argument("--chunk", type=int, default=MIB)
+    args = parser.parse_args()
+    sizes = [int(s) * MIB for s in args.sizes.split(",")]
+
+    gcs = FakeGCSServer().start()
+    for size in sizes:
+        gcs.add_synthetic(f"bench/{size // MIB}MiB.bin", size)
+    metadata = FakeMetadataServer().start()
+    env = base_env(metadata, workers=1)
+    env.update(gcs.env(), OBJECTS_CHUNK_BYTES=str(args.chunk), ACCESS_LOG="0")
+    port = free_port()
+    proc = start_gunicorn(port, env)
+    base = f"http://127.0.0.1:{port}"
+    try:
+        wait_for(base + "/healthz", lambda body: True, time.monotonic() + 60)
+        (worker,) = worker_pids(proc.pid)
+        download(f"{base}/objects/bench/{sizes[0] // MIB}MiB.bin")  # 预热客户端
+        print(f"chunk={args.chunk // 1024} KiB\n")
+        print(f"{'对象 MiB':>10}{'MiB/s':>10}{'峰值 RSS MiB':>16}{'内容一致':>10}")
+        for size in sizes:
+            reset_peak(worker)
+            total, elapsed, digest = download(
+                f"{base}/objects/bench/{size // MIB}MiB.bin"
+            )
+            ok = total == size and digest == expected_digest(size)
+            print(
+                f"{size // MIB:>10}{total / MIB / elapsed:>10.1f}"
+                f"{peak_rss_mib(worker):>16.1f}{str(ok):>10}"
+            )
+    finally:
+        proc.terminate()
+        proc.wait()
+        gcs.shutdown()
+        metadata.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""检查 /metrics 抓取不会挤掉压缩缓存里的首页条目。
+
+/metrics 每次抓取内容都不同，压缩后放进共享的 CompressionCache 永远不会再命中，
+还会把首页的压缩结果从 LRU 里挤出去。本脚本把缓存上限调小到只放得下
+首页条目外加一次 metrics 抓取，先请求一次首页，再压缩抓取 /metrics 若干次，
+然后确认缓存条目没有增加、首页条目仍在。不满足时以非零状态退出，可直接放进 CI。
+
+用法（在 helloworld/ 目录下）：
+    python bench/check_compression_cache.py [--scrapes 50]
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# 首页不等待身份源加载，检查不依赖 metadata server
+os.environ.setdefault("COLD_START_WAIT", "0")
+os.environ.setdefault("ACCESS_LOG", "0")
+
+import main  # noqa: E402
+
+HEADERS = {"Accept-Encoding": "gzip"}
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scrapes", type=int, default=50)
+    args = parser.parse_args()
+
+    client = main.app.test_client()
+    cache = main._compressed
+    index = client.get("/", headers=HEADERS)
+    scrape = client.get("/metrics", headers=HEADERS)
+    if scrape.headers.get("Content-Encoding") != "gzip":
+        print("FAIL: /metrics 没有压缩，检查不了缓存行为")
+        return 1
+    cache.max_bytes = cache._size + len(scrape.data)
+    before = list(cache._entries)
+    for _ in range(args.scrapes):
+        client.get("/metrics", headers=HEADERS)
+    after = list(cache._entries)
+
+    etag, _ = index.get_etag()
+    failures = []
+    if (etag, "gzip") not in after:
+        failures.append("首页的压缩条目被 /metrics 抓取挤出了缓存")
+    if len(after) > len(before):
+        failures.append(f"/metrics 抓取新增了 {len(after) - len(before)} 个缓存条目")
+    print(f"scrapes={args.scrapes} entries {len(before)} -> {len(after)}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print("OK")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_())
@@ -0,0 +1,102 @@
+"""多进程验证：IDENTITY_CACHE=shared 时上游调用量与 worker 数无关。
+
+用很短的 SA_EMAIL_TTL 启动多 worker 的 gunicorn（默认不 preload，每个 worker 冷启动），
+先用并发请求让每个 worker 都开始工作，再在固定时间窗内统计 metadata 替身
+收到的 SA 邮箱请求数，最后确认所有响应都读到了共享值。
+共享模式下 N 个 worker 的调用数应与 1 个 worker 相当（每个 TTL 周期只刷新一次）；
+本地模式作为对照，约为 N 倍。不满足时以非零状态退出。
+
+用法（在 helloworld/ 目录下）：
+    python bench/check_shared_cache.py [--workers 4] [--ttl 2] [--window 6] [--preload]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+from bench_cold_start import base_env, free_port, start_gunicorn, wait_for  # noqa: E402
+from fake_metadata import SA_EMAIL, FakeMetadataServer  # noqa: E402
+
+EMAIL_PATH = "/computeMetadata/v1/instance/service-accounts/default/email"
+
+
+def email_fetches(server, env, workers, window):
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/whoami"
+    proc = start_gunicorn(port, {**env, "WEB_CONCURRENCY": str(workers)})
+    try:
+        wait_for(url, lambda body: SA_EMAIL in body, time.monotonic() + 60)
+        # 不 preload 时 worker 在收到第一个请求后才启动刷新，先并发请求一轮
+        with ThreadPoolExecutor(16) as pool:
+            list(pool.map(lambda _: _get(url), range(workers * 20)))
+        time.sleep(1)
+        before = server.counts[EMAIL_PATH]
+        time.sleep(window)
+        calls = server.counts[EMAIL_PATH] - before
+        with ThreadPoolExecutor(16) as pool:
+            bodies = list(pool.map(lambda _: _get(url), range(workers * 20)))
+    finally:
+        proc.terminate()
+        proc.wait()
+    return calls, all(SA_EMAIL in body for body in bodies)
+
+
+def _get(url):
+    import urllib.request
+
+    with urllib.request.urlopen(url, timeout=5) as resp:
+        return resp.read().decode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--ttl", type=float, default=2.0)
+    parser.add_argument("--window", type=float, default=6.0)
+    parser.add_argument("--preload", action="store_true")
+    args = parser.parse_args()
+
+    server = FakeMetadataServer().start()
+    env = base_env(server, args.workers)
+    env.update(
+        PRELOAD="1" if args.preload else "0", SA_EMAIL_TTL=str(args.ttl), ACCESS_LOG="0"
+    )
+    # 刷新周期 = ttl - refresh_ahead（refresh_ahead 取 ttl / 2）
+    expected = args.window / (args.ttl / 2)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, mode, workers in (
+            ("shared x1", "shared", 1),
+            (f"shared x{args.workers}", "shared", args.workers),
+            (f"local x{args.workers}", "local", args.workers),
+        ):
+            run_env = {
+                **env,
+                "IDENTITY_CACHE": mode,
+                "SHARED_IDENTITY_PATH": os.path.join(tmp, label.replace(" ", "-")),
+            }
+            results[label] = email_fetches(server, run_env, workers, args.window)
+    server.shutdown()
+
+    print(f"window={args.window}s ttl={args.ttl}s 预期每个进程组约 {expected:.0f} 次\n")
+    print(f"{'模式':<14}{'邮箱请求':>10}{'所有 worker 读到值':>20}")
+    for label, (calls, ok) in results.items():
+        print(f"{label:<14}{calls:>10}{str(ok):>20}")
+
+    single, _ = results["shared x1"]
+    multi, multi_ok = results[f"shared x{args.workers}"]
+    # 允许一个周期的边界误差
+    if not multi_ok or multi > single + 1:
+        print("\nFAIL: 共享模式下上游调用随 worker 数增长")
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == "__main__":
+    main()
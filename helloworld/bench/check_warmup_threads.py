@@ -0,0 +1,70 @@
+"""检查 main.warmup() 之后进程里只剩主线程。
+
+gunicorn --preload 时 warmup() 跑在 master 里，之后才 fork worker；
+master 里残留的刷新线程会持续访问上游，fork 时还可能正持有锁。
+本脚本在全新解释器里（metadata 指向本地替身）执行 `main.warmup()`，
+列出 threading.enumerate() 中除主线程以外的线程，local 和 shared 两种
+IDENTITY_CACHE 模式都检查。有残留线程时以非零状态退出，可直接放进 CI。
+
+用法（在 helloworld/ 目录下）：
+    python bench/check_warmup_threads.py
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(HERE)
+sys.path.insert(0, HERE)
+
+from bench_cold_start import base_env  # noqa: E402
+from fake_metadata import FakeMetadataServer  # noqa: E402
+
+CODE = """
+import json, threading, main
+main.warmup()
+print(json.dumps([t.name for t in threading.enumerate()
+                  if t is not threading.main_thread()]))
+"""
+
+
+def leftover_threads(env):
+    proc = subprocess.run(
+        [sys.executable, "-c", CODE],
+        cwd=APP_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(proc.stdout.splitlines()[-1])
+
+
+def main():
+    server = FakeMetadataServer().start()
+    env = base_env(server, 1)
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("local", "shared"):
+            run_env = {
+                **env,
+                "IDENTITY_CACHE": mode,
+                "SHARED_IDENTITY_PATH": os.path.join(tmp, mode),
+                "ACCESS_LOG": "0",
+            }
+            threads = leftover_threads(run_env)
+            print(f"{mode:<8}{', '.join(threads) or '-'}")
+            if threads:
+                failures.append(f"{mode}: threads left after warmup(): {threads}")
+    server.shutdown()
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
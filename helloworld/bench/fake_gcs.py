@@ -0,0 +1,194 @@
+"""本地 GCS JSON API 替身，用于 /objects 代理的基准与验证。
+
+只实现对象元数据（GET /storage/v1/b/<bucket>/o/<name>）
+和媒体下载（alt=media，支持 Range）。
+对象内容可以是内存里的 bytes，也可以是按需生成的合成数据（不占内存，适合测大对象）。
+应用以 STORAGE_EMULATOR_HOST=http://127.0.0.1:<port> 启动即可连上。
+
+单独运行：
+    python bench/fake_gcs.py --port 9023 --synthetic big.bin=268435456
+"""
+
+import argparse
+import base64
+import collections
+import datetime
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+BUCKET = "bench-bucket"
+_PATTERN = bytes(range(256)) * 256
+
+
+def synthetic_bytes(start, stop):
+    """合成对象在 [start, stop) 区间的内容：按偏移循环的 0..255。"""
+    period = 256
+    head = start % period
+    data = _PATTERN[head:] + _PATTERN * ((stop - start) // len(_PATTERN) + 1)
+    return data[: stop - start]
+
+
+class _Object:
+    def __init__(self, name, size, data=None, content_type=None, generation=1):
+        self.name = name
+        self.size = size
+        self.data = data
+        self.content_type = content_type or "application/octet-stream"
+        self.generation = generation
+        self.updated = datetime.datetime.now(datetime.timezone.utc).replace(
+            microsecond=0
+        )
+        digest = hashlib.md5(f"{name}:{generation}:{size}".encode()).digest()
+        self.etag = base64.b64encode(digest).decode()
+
+    def read(self, start, stop):
+        if self.data is not None:
+            return self.data[start:stop]
+        return synthetic_bytes(start, stop)
+
+    def resource(self, server):
+        quoted = quote(self.name, safe="")
+        return {
+            "kind": "storage#object",
+            "bucket": BUCKET,
+            "name": self.name,
+            "generation": str(self.generation),
+            "metageneration": "1",
+            "size": str(self.size),
+            "contentType": self.content_type,
+            "etag": self.etag,
+            "updated": self.updated.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+            "mediaLink": (
+                f"{server.url}/download/storage/v1/b/{BUCKET}/o/{quoted}"
+                f"?generation={self.generation}&alt=media"
+            ),
+        }
+
+
+class FakeGCSServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+    # 下载按块写出，避免一次性生成整段数据
+    write_chunk = 256 * 1024
+
+    def __init__(self, address=("127.0.0.1", 0)):
+        super().__init__(address, _Handler)
+        self.objects = {}
+        self.counts = collections.Counter()
+        self._counts_lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def env(self):
+        return {"STORAGE_EMULATOR_HOST": self.url, "OBJECTS_BUCKET": BUCKET}
+
+    def add(self, name, data, content_type=None):
+        obj = self.objects.get(name)
+        generation = obj.generation + 1 if obj else 1
+        self.objects[name] = _Object(name, len(data), data, content_type, generation)
+
+    def add_synthetic(self, name, size):
+        self.objects[name] = _Object(name, size)
+
+    def count(self, kind):
+        with self._counts_lock:
+            self.counts[kind] += 1
+
+    def handle_error(self, request, client_address):
+        # 客户端提前断开（如 Range 探测）属于正常情况，不打印堆栈
+        pass
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+        path = parts.path
+        media = query.get("alt") == ["media"]
+        for prefix in ("/download/storage/v1/b/", "/storage/v1/b/"):
+            if path.startswith(prefix):
+                bucket, _, rest = path[len(prefix) :].partition("/o/")
+                break
+        else:
+            return self._send_json(404, {"error": {"code": 404, "message": "no"}})
+        obj = self.server.objects.get(unquote(rest)) if bucket == BUCKET else None
+        generation = query.get("generation")
+        if obj is None or (generation and generation[0] != str(obj.generation)):
+            return self._send_json(
+                404, {"error": {"code": 404, "message": "Not Found"}}
+            )
+        if not media:
+            self.server.count("metadata")
+            return self._send_json(200, obj.resource(self.server))
+        self.server.count("media")
+        self._send_media(obj)
+
+    def _send_media(self, obj):
+        start, stop, status = 0, obj.size, 200
+        header = self.headers.get("Range")
+        if header and header.startswith("bytes="):
+            first, _, last = header[len("bytes=") :].partition("-")
+            start = int(first) if first else max(obj.size - int(last), 0)
+            stop = min(int(last) + 1, obj.size) if first and last else obj.size
+            if start >= obj.size:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{obj.size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            status = 206
+        self.send_response(status)
+        self.send_header("Content-Type", obj.content_type)
+        self.send_header("Content-Length", str(stop - start))
+        self.send_header("x-goog-generation", str(obj.generation))
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{stop - 1}/{obj.size}")
+        self.end_headers()
+        step = self.server.write_chunk
+        for offset in range(start, stop, step):
+            self.wfile.write(obj.read(offset, min(offset + step, stop)))
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=9023)
+    parser.add_argument(
+        "--synthetic",
+        action="append",
+        default=[],
+        metavar="NAME=SIZE",
+        help="添加一个合成对象，可重复",
+    )
+    args = parser.parse_args()
+    server = FakeGCSServer(("127.0.0.1", args.port))
+    for spec in args.synthetic:
+        name, _, size = spec.partition("=")
+        server.add_synthetic(name, int(size))
+    print(f"fake GCS on {server.url} (bucket {BUCKET})")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
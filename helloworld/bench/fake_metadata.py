@@ -0,0 +1,127 @@
+"""本地 metadata server 替身，用于基准测试。
+
+实现 helloworld 和 google-auth 用到的几个 computeMetadata 端点，
+可注入固定延迟和错误率，并按路径统计请求次数。
+
+单独运行：
+    python bench/fake_metadata.py --port 8181 --latency 0.2
+然后以 GCE_METADATA_HOST=127.0.0.1:8181 GCE_METADATA_IP=127.0.0.1:8181 启动应用。
+"""
+
+import argparse
+import collections
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+SA_EMAIL = "bench-sa@bench-project.iam.gserviceaccount.com"
+PROJECT_ID = "bench-project"
+TOKEN_TTL = 3600
+
+_PREFIX = "/computeMetadata/v1/"
+_SA_PREFIX = _PREFIX + "instance/service-accounts/default/"
+
+
+class FakeMetadataServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # 压测时短时间内会有大量连接
+    request_queue_size = 1024
+
+    def __init__(self, address=("127.0.0.1", 0), latency=0.0, error_rate=0.0):
+        super().__init__(address, _Handler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.counts = collections.Counter()
+        self._counts_lock = threading.Lock()
+
+    @property
+    def host(self):
+        return f"{self.server_address[0]}:{self.server_address[1]}"
+
+    def env(self):
+        """让 helloworld 和 google-auth 都指向本服务的环境变量。"""
+        return {
+            "GCE_METADATA_HOST": self.host,
+            "GCE_METADATA_IP": self.host,
+        }
+
+    def count(self, path):
+        with self._counts_lock:
+            self.counts[path] += 1
+
+    def handle_error(self, request, client_address):
+        # 客户端超时断开是注入延迟时的正常现象，不打印堆栈
+        pass
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        path = urlsplit(self.path).path
+        server.count(path)
+        if server.latency:
+            time.sleep(server.latency)
+        if self.headers.get("Metadata-Flavor") != "Google":
+            return self._send(403, "text/plain", "missing Metadata-Flavor")
+        if server.error_rate and random.random() < server.error_rate:
+            return self._send(503, "text/plain", "injected error")
+
+        if path in ("/", _PREFIX):
+            return self._send(200, "text/plain", "computeMetadata/\n")
+        if path == _PREFIX + "project/project-id":
+            return self._send(200, "text/plain", PROJECT_ID)
+        if path == _SA_PREFIX + "email":
+            return self._send(200, "text/plain", SA_EMAIL)
+        if path == _SA_PREFIX:
+            info = {"email": SA_EMAIL, "aliases": ["default"], "scopes": []}
+            return self._send(200, "application/json", json.dumps(info))
+        if path == _SA_PREFIX + "token":
+            token = {
+                "access_token": f"bench-token-{time.time():.0f}",
+                "expires_in": TOKEN_TTL,
+                "token_type": "Bearer",
+            }
+            return self._send(200, "application/json", json.dumps(token))
+        return self._send(404, "text/plain", "not found")
+
+    do_POST = do_GET
+
+    def _send(self, status, content_type, body):
+        data = body.encode()
+        self.send_response(status)
+        self.send_header("Metadata-Flavor", "Google")
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8181)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="每个请求的延迟（秒）"
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 503 的比例")
+    args = parser.parse_args()
+    server = FakeMetadataServer(("127.0.0.1", args.port), args.latency, args.error_rate)
+    print(f"fake metadata server on http://{server.host}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,106 @@
+"""冷启动导入时间报告与预算检查。
+
+在全新解释器里执行 `python -X importtime -c "import main"`，按模块汇总累计耗时，
+并检查：
+- main 的累计导入时间不超过预算（--budget-ms，默认取 IMPORT_BUDGET_MS 或 500）；
+- 认证栈等重模块没有在导入阶段被加载（--forbid）。
+任一检查失败时以非零状态退出，可直接放进 CI。
+
+用法（在 helloworld/ 目录下）：
+    python bench/import_profile.py [--runs 3] [--top 20] [--budget-ms 500]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_FORBIDDEN = ("google.auth", "google.cloud", "requests", "urllib3")
+
+
+def _run(code, extra_args=()):
+    env = {k: v for k, v in os.environ.items() if k != "PYTHONPROFILEIMPORTTIME"}
+    return subprocess.run(
+        [sys.executable, *extra_args, "-c", code],
+        cwd=APP_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def import_times():
+    """返回 {模块名: (self_us, cumulative_us)}。"""
+    proc = _run("import main", ["-X", "importtime"])
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def loaded_modules():
+    proc = _run("import json, sys, main; print(json.dumps(sorted(sys.modules)))")
+    return json.loads(proc.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=3, help="取中位数的运行次数")
+    parser.add_argument("--top", type=int, default=20, help="报告前 N 个模块")
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=float(os.environ.get("IMPORT_BUDGET_MS", 500)),
+        help="import main 的累计耗时上限（毫秒）",
+    )
+    parser.add_argument(
+        "--forbid",
+        default=",".join(DEFAULT_FORBIDDEN),
+        help="导入阶段不允许出现的模块前缀，逗号分隔",
+    )
+    args = parser.parse_args()
+
+    runs = [import_times() for _ in range(args.runs)]
+    names = set().union(*runs)
+    merged = {
+        name: (
+            statistics.median(r.get(name, (0, 0))[0] for r in runs),
+            statistics.median(r.get(name, (0, 0))[1] for r in runs),
+        )
+        for name in names
+    }
+    ranked = sorted(merged.items(), key=lambda kv: kv[1][1], reverse=True)
+    print(f"{'module':<48}{'self ms':>10}{'cumulative ms':>16}")
+    for name, (self_us, cumulative_us) in ranked[: args.top]:
+        print(f"{name:<48}{self_us / 1000:>10.1f}{cumulative_us / 1000:>16.1f}")
+
+    failures = []
+    total_ms = merged.get("main", (0, 0))[1] / 1000
+    print(f"\nimport main: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    if total_ms > args.budget_ms:
+        failures.append(f"import main took {total_ms:.1f} ms > {args.budget_ms} ms")
+
+    prefixes = [p for p in args.forbid.split(",") if p]
+    eager = [
+        m
+        for m in loaded_modules()
+        if any(m == p or m.startswith(p + ".") for p in prefixes)
+    ]
+    if eager:
+        failures.append("imported at startup: " + ", ".join(eager))
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""轻量压测客户端（asyncio 原生 socket + HTTP/1.1 keep-alive），供各基准脚本复用。
+
+两种模式：run() 以固定并发持续请求（闭环）；run_rate() 以固定请求速率发送（开环），
+延迟从计划发送时刻算起，服务端排队会如实体现在尾延迟里（避免协同遗漏）。
+
+不用 httpx 等高层客户端：单核机器上客户端自身开销会先于被测服务成为瓶颈。
+服务端返回 Connection: close（如 gunicorn sync worker）时自动重连。
+"""
+
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+
+def percentile(samples, q):
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+def summarize(latencies, errors, elapsed):
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else float("nan"),
+    }
+
+
+class _Connection:
+    """单个 keep-alive 连接；每次 get() 返回状态码。"""
+
+    def __init__(self, host, port, path, headers=None):
+        self.host = host
+        self.port = port
+        extra = "".join(f"{k}: {v}\r\n" for k, v in (headers or {}).items())
+        self.request = (
+            f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\n{extra}\r\n"
+        ).encode()
+        self.reader = self.writer = None
+
+    async def get(self):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(
+                self.host, self.port
+            )
+        self.writer.write(self.request)
+        await self.writer.drain()
+        head = await self.reader.readuntil(b"\r\n\r\n")
+        lines = head.split(b"\r\n")
+        status = int(lines[0].split()[1])
+        length, close = 0, False
+        for line in lines[1:]:
+            name, _, value = line.partition(b":")
+            name = name.strip().lower()
+            if name == b"content-length":
+                length = int(value)
+            elif name == b"connection" and value.strip().lower() == b"close":
+                close = True
+        await self.reader.readexactly(length)
+        if close:
+            self.close()
+        return status
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+
+async def _closed_loop(url, concurrency, duration, timeout, headers):
+    parts = urlsplit(url)
+    path = parts.path or "/"
+    latencies = []
+    errors = 0
+    stop_at = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal errors
+        conn = _Connection(parts.hostname, parts.port or 80, path, headers)
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            try:
+                ok = await asyncio.wait_for(conn.get(), timeout) < 500
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+                conn.close()
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+        conn.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+def run(url, concurrency=50, duration=5.0, timeout=30.0, headers=None):
+    """以 concurrency 个并发连接持续请求 duration 秒。"""
+    return asyncio.run(_closed_loop(url, concurrency, duration, timeout, headers))
+
+
+async def _open_loop(url, rate, duration, max_connections, timeout, headers):
+    parts = urlsplit(url)
+    path = parts.path or "/"
+    idle = asyncio.Queue()
+    for _ in range(max_connections):
+        idle.put_nowait(_Connection(parts.hostname, parts.port or 80, path, headers))
+    latencies = []
+    errors = 0
+
+    async def one(scheduled):
+        nonlocal errors
+        conn = await idle.get()
+        try:
+            ok = await asyncio.wait_for(conn.get(), timeout) < 500
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+            conn.close()
+            ok = False
+        finally:
+            idle.put_nowait(conn)
+        if ok:
+            latencies.append(time.perf_counter() - scheduled)
+        else:
+            errors += 1
+
+    tasks = []
+    start = time.perf_counter()
+    total = int(rate * duration)
+    for i in range(total):
+        scheduled = start + i / rate
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.ensure_future(one(scheduled)))
+    await asyncio.gather(*tasks)
+    result = summarize(latencies, errors, time.perf_counter() - start)
+    result["target_rps"] = rate
+    return result
+
+
+def run_rate(url, rate, duration=10.0, max_connections=64, timeout=30.0, headers=None):
+    """以每秒 rate 个请求的固定速率发送 duration 秒，连接数上限为 max_connections。"""
+    return asyncio.run(
+        _open_loop(url, rate, duration, max_connections, timeout, headers)
+    )
@@ -0,0 +1,169 @@
+"""helloworld 负载与延迟基准：gunicorn sync / threaded worker + 本地 metadata 替身。
+
+对每种 worker 模式启动一次 gunicorn，以固定请求速率（开环）分别压测各路由，
+记录 p50 / p95 / p99 延迟、实际 RPS、错误数和 worker CPU
+（所有 worker 的 user+sys 秒数 / 时长，即平均占用的核数）。
+metadata 替身可注入延迟和错误率。结果写成 JSON（含当前 git 提交），
+用 --compare 指定上一次的结果文件即可打印逐项变化，便于跨提交比较。
+
+用法（在 helloworld/ 目录下）：
+    python bench/loadtest.py --rate 200 --duration 10 --out results.json
+    python bench/loadtest.py --compare results.json --out results-new.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+import loadgen  # noqa: E402
+from bench_cold_start import base_env, free_port, start_gunicorn, wait_for  # noqa: E402
+from fake_metadata import SA_EMAIL, FakeMetadataServer  # noqa: E402
+
+MODES = {
+    "sync": {"GUNICORN_THREADS": "1"},
+    # threads > 1 时 gunicorn 自动使用 gthread worker
+    "threaded": {"GUNICORN_THREADS": "8"},
+}
+_CLK_TCK = os.sysconf("SC_CLK_TCK")
+
+
+def worker_pids(master):
+    with open(f"/proc/{master}/task/{master}/children") as f:
+        return [int(pid) for pid in f.read().split()]
+
+
+def cpu_seconds(pids):
+    total = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                # comm 字段可能含空格，从最后一个 ')' 之后再切分
+                fields = f.read().rsplit(")", 1)[1].split()
+        except FileNotFoundError:
+            continue
+        total += int(fields[11]) + int(fields[12])  # utime + stime
+    return total / _CLK_TCK
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=HERE,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_mode(mode, env, args):
+    port = free_port()
+    proc = start_gunicorn(port, {**env, **MODES[mode]})
+    base = f"http://127.0.0.1:{port}"
+    results = {}
+    try:
+        wait_for(base + "/whoami", lambda body: SA_EMAIL in body, time.monotonic() + 60)
+        pids = worker_pids(proc.pid)
+        for path in args.paths:
+            # 短暂预热，让每个 worker 都完成首个请求
+            loadgen.run_rate(base + path, args.rate, 1.0, args.connections)
+            cpu_before = cpu_seconds(pids)
+            result = loadgen.run_rate(
+                base + path, args.rate, args.duration, args.connections
+            )
+            result["worker_cpu"] = (cpu_seconds(pids) - cpu_before) / args.duration
+            results[path] = result
+    finally:
+        proc.terminate()
+        proc.wait()
+    return results
+
+
+def print_results(results, previous=None):
+    print(
+        f"{'模式':<10}{'路由':<10}{'RPS':>8}{'p50 ms':>9}{'p95 ms':>9}"
+        f"{'p99 ms':>9}{'CPU':>7}{'错误':>6}"
+    )
+    for mode, paths in results.items():
+        for path, r in paths.items():
+            line = (
+                f"{mode:<10}{path:<10}{r['rps']:>8.0f}{r['p50_ms']:>9.2f}"
+                f"{r['p95_ms']:>9.2f}{r['p99_ms']:>9.2f}{r['worker_cpu']:>7.2f}"
+                f"{r['errors']:>6}"
+            )
+            old = (previous or {}).get(mode, {}).get(path)
+            if old:
+                line += "  Δp99 {:+.1f}% ΔCPU {:+.1f}%".format(
+                    _change(old["p99_ms"], r["p99_ms"]),
+                    _change(old["worker_cpu"], r["worker_cpu"]),
+                )
+            print(line)
+
+
+def _change(old, new):
+    return (new - old) / old * 100 if old else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rate", type=float, default=200, help="每秒请求数")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--connections", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--modes", default="sync,threaded")
+    parser.add_argument("--paths", default="/,/whoami")
+    parser.add_argument("--latency", type=float, default=0.05, help="metadata 延迟")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--out", help="结果 JSON 的输出路径")
+    parser.add_argument("--compare", help="上一次的结果 JSON，打印变化")
+    args = parser.parse_args()
+    args.paths = args.paths.split(",")
+
+    server = FakeMetadataServer(latency=args.latency, error_rate=args.error_rate)
+    server.start()
+    env = base_env(server, args.workers)
+    env["ACCESS_LOG"] = "0"
+    results = {mode: bench_mode(mode, env, args) for mode in args.modes.split(",")}
+    server.shutdown()
+
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)["results"]
+    print_results(results, previous)
+    if args.out:
+        report = {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "config": {
+                k: getattr(args, k)
+                for k in (
+                    "rate",
+                    "duration",
+                    "connections",
+                    "workers",
+                    "latency",
+                    "error_rate",
+                )
+            },
+            "metadata_calls": dict(server.counts),
+            "results": results,
+        }
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\n结果已写入 {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""上游调用的熔断器与截止时间预算。"""
+
+import os
+import threading
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class Deadline:
+    """一次刷新周期内所有上游调用共享的时间预算。"""
+
+    def __init__(self, seconds):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return self.expires_at - time.monotonic()
+
+    def timeout(self, cap=None):
+        """返回本次调用可用的超时；预算耗尽时抛出 DeadlineExceeded。"""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded("upstream deadline exceeded")
+        return remaining if cap is None else min(cap, remaining)
+
+
+class CircuitBreaker:
+    """连续失败达到阈值后打开；冷却期过后放行一次探测（half-open）。"""
+
+    def __init__(self, name, failure_threshold=3, cooldown=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self.state != CLOSED
+
+    def retry_in(self):
+        """距下一次允许探测还有多少秒；未打开时为 0。"""
+        if self.state == CLOSED:
+            return 0.0
+        return max(self.opened_at + self.cooldown - time.monotonic(), 0.0)
+
+    def allow(self):
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() >= (
+                self.opened_at + self.cooldown
+            ):
+                # 只放行一个探测请求，其余调用继续走降级
+                self.state = HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+
+def from_env(name):
+    """按 BREAKER_FAILURES / BREAKER_COOLDOWN 环境变量创建熔断器。"""
+    return CircuitBreaker(
+        name,
+        failure_threshold=int(os.environ.get("BREAKER_FAILURES", 3)),
+        cooldown=float(os.environ.get("BREAKER_COOLDOWN", 30)),
+    )
@@ -0,0 +1,141 @@
+"""响应压缩：按 Accept-Encoding 协商 br / gzip。
+
+- 静态片段导入时压缩一次（raw deflate + sync flush），需要时与动态字段拼接成 gzip 流；
+- 带 ETag 的正文按 ETag 放进有界 LRU，相同表示不重复压缩；
+- 没有 ETag 的正文（如每次抓取都不同的 /metrics）现压现发，不进缓存，免得挤掉可复用的条目。
+"""
+
+import collections
+import gzip
+import struct
+import threading
+import zlib
+
+try:
+    import brotli
+except ImportError:  # brotli 是可选依赖，没有时只提供 gzip
+    brotli = None
+
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+COMPRESSIBLE_MIMETYPES = frozenset(
+    ["text/html", "text/plain", "text/css", "application/json"]
+)
+MIN_SIZE = 256
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# gzip 头：magic、deflate、无 flag、mtime=0、XFL=0、OS=255(unknown)
+_GZIP_HEADER = b"\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff"
+# 空的 final 块（固定 Huffman），用于结束拼接出的 deflate 流
+_DEFLATE_END = b"\x03\x00"
+
+
+def negotiate(accept_encodings):
+    """从 werkzeug 的 request.accept_encodings 中选出支持的编码，没有则返回 None。"""
+    return accept_encodings.best_match(ENCODINGS)
+
+
+def compress(data, encoding):
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    if encoding == "br" and brotli is not None:
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    raise ValueError(f"unsupported encoding: {encoding}")
+
+
+def deflate_fragment(data):
+    """把静态片段压缩成可拼接的 raw deflate 块（以 sync flush 结尾、字节对齐）。"""
+    c = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return c.compress(data) + c.flush(zlib.Z_SYNC_FLUSH)
+
+
+def _stored_blocks(data):
+    # 动态字段很短，直接以 stored 块写入，不做压缩
+    out = []
+    for i in range(0, len(data), 0xFFFF):
+        chunk = data[i : i + 0xFFFF]
+        out.append(b"\x00" + struct.pack("<HH", len(chunk), len(chunk) ^ 0xFFFF))
+        out.append(chunk)
+    return b"".join(out)
+
+
+def splice_gzip(pieces):
+    """把 (原始字节, 预压缩块或 None) 序列拼成一个完整的 gzip 流。"""
+    out = [_GZIP_HEADER]
+    crc = 0
+    size = 0
+    for raw, deflated in pieces:
+        crc = zlib.crc32(raw, crc)
+        size += len(raw)
+        out.append(deflated if deflated is not None else _stored_blocks(raw))
+    out.append(_DEFLATE_END)
+    out.append(struct.pack("<II", crc, size & 0xFFFFFFFF))
+    return b"".join(out)
+
+
+class CompressionCache:
+    """按 (ETag, 编码) 缓存压缩结果，总大小超过 max_bytes 时淘汰最久未用的条目。"""
+
+    def __init__(self, max_bytes=4 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = collections.OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, encoding, produce):
+        """produce() 返回压缩后的字节；只在未命中时调用。"""
+        k = (key, encoding)
+        with self._lock:
+            data = self._entries.get(k)
+            if data is not None:
+                self._entries.move_to_end(k)
+                self.hits += 1
+                return data
+            self.misses += 1
+        data = produce()
+        if len(data) > self.max_bytes:
+            return data
+        with self._lock:
+            if k not in self._entries:
+                self._entries[k] = data
+                self._size += len(data)
+                while self._size > self.max_bytes:
+                    _, old = self._entries.popitem(last=False)
+                    self._size -= len(old)
+        return data
+
+
+def apply(response, accept_encodings, cache):
+    """Flask after_request 用：对尚未编码的文本类响应做压缩。"""
+    response.vary.add("Accept-Encoding")
+    if (
+        response.status_code != 200
+        or response.direct_passthrough
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+    encoding = negotiate(accept_encodings)
+    if encoding is None:
+        return response
+    body = response.get_data()
+    if len(body) < MIN_SIZE:
+        return response
+    etag, _ = response.get_etag()
+    if etag:
+        data = cache.get(etag, encoding, lambda: compress(body, encoding))
+    else:
+        data = compress(body, encoding)
+    response.set_data(data)
+    response.headers["Content-Encoding"] = encoding
+    mark_encoded(response)
+    return response
+
+
+def mark_encoded(response):
+    """压缩后的表示与原文不同，ETag 降为弱校验。"""
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
@@ -0,0 +1,31 @@
+"""gunicorn 配置：默认在 master 中预热后再 fork worker。
+
+PRELOAD=0 时退回到每个 worker 各自导入、各自解析身份的旧行为。
+IDENTITY_CACHE=shared 时由 master 负责删除 /dev/shm 中的共享身份文件。
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 1))
+
+if os.environ.get("PRELOAD", "1") == "1":
+    preload_app = True
+    wsgi_app = "main:create_app()"
+else:
+    wsgi_app = "main:app"
+
+
+if os.environ.get("IDENTITY_CACHE", "local") == "shared":
+
+    def on_starting(server):
+        # 清理上次异常退出（没有执行 on_exit）留下的共享身份文件
+        import sharedcache
+
+        sharedcache.remove_stale()
+
+    def on_exit(server):
+        import sharedcache
+
+        sharedcache.remove(os.environ.get("SHARED_IDENTITY_PATH"))
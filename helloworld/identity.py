@@ -0,0 +1,495 @@
+"""进程级身份缓存。
+
+热路径上的请求只读内存里的值，网络 I/O 全部交给后台线程。
+认证栈（google.auth / requests / urllib3）和 urllib.request 都在首次使用时才导入，
+不计入冷启动的导入时间。
+"""
+
+import collections
+import concurrent.futures
+import datetime
+import os
+import threading
+import time
+
+import metrics
+from breaker import Deadline
+
+METADATA_HOST = os.environ.get("GCE_METADATA_HOST", "metadata.google.internal")
+METADATA_ROOT = f"http://{METADATA_HOST}/computeMetadata/v1/"
+METADATA_HEADERS = {"Metadata-Flavor": "Google"}
+
+POOL_WORKERS = int(os.environ.get("IDENTITY_POOL_WORKERS", 4))
+POOL_QUEUE = int(os.environ.get("IDENTITY_POOL_QUEUE", 16))
+
+_metadata_probe_lock = threading.Lock()
+_metadata_available = None
+
+
+def metadata_server_available(timeout=0.5):
+    """探测一次 metadata server 是否存在，结果在进程内复用。"""
+    global _metadata_available
+    if _metadata_available is not None:
+        return _metadata_available
+    import urllib.request
+
+    with _metadata_probe_lock:
+        if _metadata_available is None:
+            try:
+                req = urllib.request.Request(METADATA_ROOT, headers=METADATA_HEADERS)
+                with urllib.request.urlopen(req, timeout=timeout) as resp:
+                    flavor = resp.headers.get("Metadata-Flavor")
+                _metadata_available = flavor == "Google"
+            except Exception:
+                _metadata_available = False
+    return _metadata_available
+
+
+class TTLCache:
+    """单值 TTL 缓存：过期前由后台线程提前刷新，失败结果短暂缓存。
+
+    loader(timeout=...) 返回 None 视为失败，按 negative_ttl 缓存；get() 永远不阻塞。
+    available 为 False 时（例如没有 metadata server）不再发起任何加载。
+    每次刷新共享一个 deadline 秒的预算；熔断器打开期间不调用 loader，继续返回旧值。
+    """
+
+    def __init__(
+        self,
+        loader,
+        ttl=300.0,
+        refresh_ahead=30.0,
+        negative_ttl=10.0,
+        available=None,
+        breaker=None,
+        deadline=5.0,
+    ):
+        self._loader = loader
+        self._available = available
+        self._breaker = breaker
+        self.deadline = deadline
+        self.ttl = ttl
+        self.refresh_ahead = min(refresh_ahead, ttl / 2)
+        self.negative_ttl = negative_ttl
+        self._value = None
+        self._expires_at = 0.0
+        self._refresh_at = 0.0
+        self._disabled = False
+        self._failing = False
+        self._loaded = threading.Event()
+        self._load_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    @property
+    def loaded(self):
+        return self._loaded.is_set()
+
+    @property
+    def status(self):
+        """pending / ok / failing / open / disabled，只读内存状态。"""
+        if not self._loaded.is_set():
+            return "pending"
+        if self._disabled:
+            return "disabled"
+        if self._breaker is not None and self._breaker.is_open:
+            return "open"
+        return "failing" if self._failing else "ok"
+
+    def start(self):
+        """拉起后台刷新线程（不阻塞、不做 I/O）。"""
+        self._ensure_refresher()
+
+    @property
+    def refreshing(self):
+        """本进程内后台刷新线程是否已在运行。"""
+        return self._pid == os.getpid()
+
+    def wait(self, timeout=None):
+        return self._loaded.wait(timeout)
+
+    def get(self):
+        """返回当前缓存值（可能为 None），必要时拉起后台刷新线程。"""
+        self._ensure_refresher()
+        return self.peek()
+
+    def peek(self):
+        """同 get()，但不拉起后台线程（可在 gunicorn master 中调用）。"""
+        if self._value is not None and self._expires_at <= time.monotonic():
+            # 熔断期间宁可返回最后一次成功的值
+            if self._breaker is None or not self._breaker.is_open:
+                return None
+        return self._value
+
+    def warmup(self, timeout=None, deadline=None):
+        """同步加载一次；用于进程启动阶段，而不是请求路径。
+
+        不在这里启动后台线程：preload 时 warmup 跑在 gunicorn master 里，
+        线程留到 fork 之后第一次 get() 时再按进程拉起。
+        """
+        if not self._loaded.is_set():
+            self.refresh(deadline)
+        return self._loaded.wait(timeout)
+
+    def refresh(self, deadline=None):
+        with self._load_lock:
+            if self._disabled or (self._available and not self._available()):
+                self._disabled = True
+                self._loaded.set()
+                return None
+            breaker = self._breaker
+            if breaker is not None and not breaker.allow():
+                self._failing = True
+                self._refresh_at = time.monotonic() + max(breaker.retry_in(), 1.0)
+                self._loaded.set()
+                return self._value
+            deadline = deadline or Deadline(self.deadline)
+            try:
+                value = self._loader(timeout=deadline.timeout())
+            except Exception:
+                value = None
+            if breaker is not None:
+                if value is None:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+            now = time.monotonic()
+            self._failing = value is None
+            if value is not None:
+                self._value = value
+                self._expires_at = now + self.ttl
+                self._refresh_at = self._expires_at - self.refresh_ahead
+            else:
+                # 失败时短暂缓存；旧值仍在有效期内（或熔断已打开）则继续使用旧值
+                if self._expires_at <= now and not (breaker and breaker.is_open):
+                    self._value = None
+                self._refresh_at = now + self.negative_ttl
+            self._loaded.set()
+        return self._value
+
+    def invalidate(self):
+        """让后台线程立即刷新。"""
+        self._refresh_at = 0.0
+        self._wakeup.set()
+
+    def _ensure_refresher(self):
+        # gunicorn fork 之后线程不会被继承，按 pid 判断是否需要重新拉起
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._start_lock:
+            if self._pid == pid:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="ttl-cache-refresh", daemon=True
+            )
+            self._thread.start()
+            self._pid = pid
+
+    def _run(self):
+        while not self._disabled:
+            if self._loaded.is_set():
+                delay = self._refresh_at - time.monotonic()
+                if delay > 0:
+                    self._wakeup.wait(delay)
+                    self._wakeup.clear()
+                    continue
+            self.refresh()
+
+
+CredentialsState = collections.namedtuple(
+    "CredentialsState", ["project", "service_account_email", "valid", "error"]
+)
+
+_PENDING_ERROR = "credentials not resolved yet"
+_ADC_DEFAULT = metrics.UPSTREAM_LATENCY.labels("google.auth.default")
+_ADC_REFRESH = metrics.UPSTREAM_LATENCY.labels("credentials.refresh")
+
+
+class CredentialsManager:
+    """进程内共享的 ADC 凭证。
+
+    google.auth.default() 只解析一次；token 在过期前 refresh_margin 秒由后台定时刷新。
+    需要刷新时并发调用方共享同一次进行中的刷新（single-flight）。
+    一次刷新里的所有 HTTP 调用共享 deadline 秒的预算；熔断器打开期间沿用旧凭证。
+    """
+
+    def __init__(
+        self,
+        refresh_margin=300.0,
+        retry_delay=10.0,
+        default_ttl=3600.0,
+        breaker=None,
+        deadline=5.0,
+    ):
+        self._breaker = breaker
+        self.deadline = deadline
+        self.refresh_margin = refresh_margin
+        self.retry_delay = retry_delay
+        self.default_ttl = default_ttl
+        self._credentials = None
+        self._project = None
+        self._error = _PENDING_ERROR
+        self._refresh_at = 0.0
+        self._failing = False
+        self._loaded = threading.Event()
+        self._lock = threading.Lock()
+        self._inflight = None
+        self._wakeup = threading.Event()
+        self._pid = None
+
+    @property
+    def loaded(self):
+        return self._loaded.is_set()
+
+    @property
+    def status(self):
+        """pending / ok / failing / open，只读内存状态。"""
+        if not self._loaded.is_set():
+            return "pending"
+        if self._breaker is not None and self._breaker.is_open:
+            return "open"
+        return "failing" if self._failing else "ok"
+
+    def start(self):
+        """拉起后台刷新线程（不阻塞、不做 I/O）。"""
+        self._ensure_refresher()
+
+    @property
+    def refreshing(self):
+        """本进程内后台刷新线程是否已在运行。"""
+        return self._pid == os.getpid()
+
+    def wait(self, timeout=None):
+        return self._loaded.wait(timeout)
+
+    @property
+    def expiry(self):
+        """当前 token 的过期时间（不带时区的 UTC datetime），未知时为 None。"""
+        return getattr(self._credentials, "expiry", None)
+
+    def snapshot(self):
+        """返回当前凭证状态；只读内存，不做任何 I/O。"""
+        self._ensure_refresher()
+        return self.peek()
+
+    def peek(self):
+        """同 snapshot()，但不拉起后台线程（可在 gunicorn master 中调用）。"""
+        credentials = self._credentials
+        if credentials is None:
+            return CredentialsState(None, None, False, self._error)
+        return CredentialsState(
+            self._project,
+            getattr(credentials, "service_account_email", None),
+            getattr(credentials, "valid", False),
+            None,
+        )
+
+    def warmup(self, timeout=None, deadline=None):
+        """同步解析并刷新一次；用于进程启动阶段，同样不启动后台线程。"""
+        if not self._loaded.is_set():
+            self.refresh(deadline)
+        return self._loaded.wait(timeout)
+
+    def refresh(self, deadline=None):
+        """刷新 token；已有刷新在进行时等待它完成而不是再发一次。"""
+        with self._lock:
+            flight = self._inflight
+            leader = flight is None
+            if leader:
+                flight = self._inflight = threading.Event()
+        # 返回 peek() 而不是 snapshot()：warmup() 在 gunicorn master 里也会走到这里，
+        # 后台线程只由请求路径上的 snapshot() 拉起
+        if not leader:
+            flight.wait()
+            return self.peek()
+        try:
+            self._do_refresh(deadline or Deadline(self.deadline))
+        finally:
+            with self._lock:
+                self._inflight = None
+            flight.set()
+        return self.peek()
+
+    def invalidate(self):
+        """让后台线程立即刷新。"""
+        self._refresh_at = 0.0
+        self._wakeup.set()
+
+    def _do_refresh(self, deadline):
+        import google.auth
+        from google.auth.transport.requests import Request
+
+        breaker = self._breaker
+        if breaker is not None and not breaker.allow():
+            self._failing = True
+            self._refresh_at = time.monotonic() + max(breaker.retry_in(), 1.0)
+            self._loaded.set()
+            return
+        request = _DeadlineRequest(Request(), deadline)
+        try:
+            if self._credentials is None:
+                self._credentials, self._project = _ADC_DEFAULT.timed(
+                    google.auth.default
+                )(request=request)
+            _ADC_REFRESH.timed(self._credentials.refresh)(request)
+            self._error = None
+            self._failing = False
+            self._refresh_at = time.monotonic() + self._seconds_until_refresh()
+            if breaker is not None:
+                breaker.record_success()
+        except Exception as e:
+            self._failing = True
+            if self._credentials is None:
+                self._error = str(e)
+            self._refresh_at = time.monotonic() + self.retry_delay
+            if breaker is not None:
+                breaker.record_failure()
+        finally:
+            self._loaded.set()
+
+    def _seconds_until_refresh(self):
+        expiry = getattr(self._credentials, "expiry", None)
+        if expiry is None:
+            return self.default_ttl
+        # google-auth 的 expiry 是不带时区的 UTC 时间
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        remaining = (expiry - now).total_seconds() - self.refresh_margin
+        return max(remaining, self.retry_delay)
+
+    def _ensure_refresher(self):
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            threading.Thread(target=self._run, name="adc-refresh", daemon=True).start()
+            self._pid = pid
+
+    def _run(self):
+        while True:
+            if self._loaded.is_set():
+                delay = self._refresh_at - time.monotonic()
+                if delay > 0:
+                    self._wakeup.wait(delay)
+                    self._wakeup.clear()
+                    continue
+            self.refresh()
+
+
+class _DeadlineRequest:
+    """包装 google-auth 的 transport Request，把每次调用的超时压到剩余预算以内。"""
+
+    def __init__(self, request, deadline):
+        self._request = request
+        self._deadline = deadline
+
+    def __call__(self, *args, timeout=None, **kwargs):
+        return self._request(*args, timeout=self._deadline.timeout(timeout), **kwargs)
+
+
+class PoolFull(Exception):
+    pass
+
+
+class BoundedPool:
+    """固定线程数 + 有界排队的线程池；排队已满时 submit 直接抛 PoolFull。
+
+    线程不能跨 fork 继承，每个进程第一次 submit 时各自创建执行器。
+    """
+
+    def __init__(self, workers=4, queue_size=16):
+        self.workers = workers
+        self.queue_size = queue_size
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        pid = os.getpid()
+        if self._pid != pid:
+            with self._lock:
+                if self._pid != pid:
+                    self._executor = concurrent.futures.ThreadPoolExecutor(
+                        self.workers, thread_name_prefix="identity"
+                    )
+                    self._slots = threading.BoundedSemaphore(
+                        self.workers + self.queue_size
+                    )
+                    self._pid = pid
+        return self._executor
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+            self._executor = None
+            self._pid = None
+
+    def submit(self, fn, *args, **kwargs):
+        executor = self._get_executor()
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            raise PoolFull("identity pool queue is full")
+        future = executor.submit(fn, *args, **kwargs)
+        future.add_done_callback(lambda _: slots.release())
+        return future
+
+
+POOL = BoundedPool(POOL_WORKERS, POOL_QUEUE)
+
+_inflight_warmups = {}
+_inflight_lock = threading.Lock()
+
+
+def wait_all(sources, deadline):
+    """只等待已经由 start() 拉起的加载，最多等到 deadline；不提交任何任务、不做 I/O。
+
+    用于请求路径：上游调用只由各源自己的后台线程发起，请求线程不会再多打一次上游。
+    返回是否全部加载完成。
+    """
+    for source in sources:
+        if not source.loaded:
+            remaining = deadline.remaining()
+            if remaining > 0:
+                source.wait(remaining)
+    return all(source.loaded for source in sources)
+
+
+def resolve_all(sources, deadline):
+    """并发解析所有尚未加载的身份源，最多等到 deadline；总耗时取最慢的一个而不是求和。
+
+    已有后台刷新线程的源只等待其结果；否则提交到共享线程池执行 warmup，
+    同一个源同时只会有一个进行中的 warmup。返回是否全部加载完成。
+    """
+    waits = []
+    for source in sources:
+        if source.loaded:
+            continue
+        if source.refreshing:
+            waits.append(source)
+            continue
+        with _inflight_lock:
+            future = _inflight_warmups.get(id(source))
+            if future is None or future.done():
+                try:
+                    future = POOL.submit(source.warmup, deadline=deadline)
+                except PoolFull:
+                    future = None
+                _inflight_warmups[id(source)] = future
+        if future is not None:
+            waits.append(future)
+    for w in waits:
+        remaining = deadline.remaining()
+        if remaining > 0:
+            if isinstance(w, concurrent.futures.Future):
+                try:
+                    w.result(remaining)
+                except Exception:
+                    pass
+            else:
+                w.wait(remaining)
+    return all(source.loaded for source in sources)
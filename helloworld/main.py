@@ -1,270 +1,295 @@
+import calendar
+import gc
 import os
-import html
 import sys
+import time
 
-from flask import Flask, jsonify
+from flask import Flask, Response, g, jsonify, request
 import flask as flask_pkg
-import google.auth
-from google.auth.transport.requests import Request
-import urllib.request
+
+import accesslog
+import identity
+from identity import (
+    METADATA_HEADERS,
+    METADATA_ROOT,
+    CredentialsManager,
+    CredentialsState,
+    TTLCache,
+    metadata_server_available,
+)
+import breaker
+import compression
+from breaker import Deadline
+import metrics
+import objects
+import page
+import sharedcache
+import views
 
 app = Flask(__name__)
 
+# Python / Flask 版本在进程内不变，导入时直接烘焙进静态外壳
+_INDEX = page.INDEX.bind(
+    python_version=sys.version.split(" ")[0],
+    flask_version=flask_pkg.__version__,
+)
+_compressed = compression.CompressionCache(
+    max_bytes=int(os.environ.get("COMPRESSION_CACHE_BYTES", 4 * 1024 * 1024))
+)
+
+_NO_STORE = {"Cache-Control": "no-store"}
+_ACCESS_LOG = os.environ.get("ACCESS_LOG", "1") == "1"
+
+_RENDER_INDEX = metrics.RENDER_LATENCY.labels("/")
+
+
+@_RENDER_INDEX.timed
+def _render_plain(values):
+    with accesslog.timed("render"):
+        return _INDEX.render(values)
+
+
+@metrics.UPSTREAM_LATENCY.labels("metadata_sa_email").timed
+def _metadata_sa_email(timeout=5):
+    import urllib.request
 
-def _metadata_sa_email():
     try:
         req = urllib.request.Request(
-            "http://metadata.google.internal/computeMetadata/v1/instance/service-accounts/default/email",
-            headers={"Metadata-Flavor": "Google"},
+            METADATA_ROOT + "instance/service-accounts/default/email",
+            headers=METADATA_HEADERS,
         )
-        with urllib.request.urlopen(req, timeout=5) as resp:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
             return resp.read().decode().strip()
     except Exception:
         return None
 
 
+# 每个刷新周期内所有上游调用共享的时间预算（秒），替代各自独立的固定超时
+_UPSTREAM_DEADLINE = float(os.environ.get("UPSTREAM_DEADLINE", 5))
+
+# SA 邮箱在实例生命周期内基本不变：后台刷新，请求路径只读缓存
+_sa_email_cache = TTLCache(
+    _metadata_sa_email,
+    ttl=float(os.environ.get("SA_EMAIL_TTL", 300)),
+    negative_ttl=float(os.environ.get("SA_EMAIL_NEGATIVE_TTL", 10)),
+    available=metadata_server_available,
+    breaker=breaker.from_env("metadata"),
+    deadline=_UPSTREAM_DEADLINE,
+)
+
+# ADC 只解析一次，token 在过期前后台刷新；路由只读快照
+_credentials = CredentialsManager(
+    refresh_margin=float(os.environ.get("ADC_REFRESH_MARGIN", 300)),
+    breaker=breaker.from_env("adc"),
+    deadline=_UPSTREAM_DEADLINE,
+)
+
+
+def _collect_identity():
+    """leader 发布到共享缓存的内容：SA 邮箱、project、token 过期时间和各上游状态。"""
+    # 用 peek()：preload 时 master 也会调用这里，不能在 master 里拉起刷新线程
+    creds = _credentials.peek()
+    expiry = _credentials.expiry
+    return {
+        "sa_meta": _sa_email_cache.peek(),
+        "project": creds.project,
+        "sa_adc": creds.service_account_email,
+        "valid": creds.valid,
+        "error": creds.error,
+        "expiry": calendar.timegm(expiry.utctimetuple()) if expiry else None,
+        "upstreams": {"metadata": _sa_email_cache.status, "adc": _credentials.status},
+    }
+
+
+# IDENTITY_CACHE=shared：实例内所有 worker 共享一份身份缓存，只有一个 worker 访问上游
+if os.environ.get("IDENTITY_CACHE", "local") == "shared":
+    _shared = sharedcache.SharedIdentity(
+        (_sa_email_cache, _credentials),
+        _collect_identity,
+        path=os.environ.get("SHARED_IDENTITY_PATH"),
+    )
+    _IDENTITY_SOURCES = {"shared": _shared}
+else:
+    _shared = None
+    _IDENTITY_SOURCES = {"metadata": _sa_email_cache, "adc": _credentials}
+# 冷 worker（未预热）上请求最多等待身份源并发加载的秒数；0 表示不等待
+_COLD_START_WAIT = float(os.environ.get("COLD_START_WAIT", 1))
+
+
+def _resolve_identity():
+    """常规路径只检查标志位；身份源尚未加载时等待后台加载，最多 COLD_START_WAIT 秒。
+
+    加载已由 start() 在各源的后台线程中发起，这里只等待，不向 identity.POOL 提交。
+    """
+    sources = _IDENTITY_SOURCES.values()
+    for source in sources:
+        source.start()
+    if _COLD_START_WAIT > 0 and not all(s.loaded for s in sources):
+        # 各源同时在后台加载，逐个等待时后面的源已经在前面的等待里加载了一部分，
+        # 按源拆分会重叠；访问日志只记一个总的冷启动等待时间
+        with accesslog.timed("identity_wait"):
+            identity.wait_all(sources, Deadline(_COLD_START_WAIT))
+
+
+def _identity():
+    """返回 (ADC 快照, metadata SA 邮箱)，各自的读取耗时计入访问日志。"""
+    _resolve_identity()
+    if _shared is not None:
+        with accesslog.timed("shared"):
+            return _shared_identity(_shared.snapshot())
+    with accesslog.timed("adc"):
+        creds = _credentials.snapshot()
+    with accesslog.timed("metadata"):
+        sa_meta = _sa_email_cache.get()
+    return creds, sa_meta
+
+
+_NOT_PUBLISHED = "shared identity not published yet"
+
+
+def _shared_identity(record):
+    if record is None:
+        return CredentialsState(None, None, False, _NOT_PUBLISHED), None
+    expiry = record["expiry"]
+    valid = record["valid"] and (expiry is None or expiry > time.time())
+    creds = CredentialsState(
+        record["project"], record["sa_adc"], valid, record["error"]
+    )
+    return creds, record["sa_meta"]
+
+
+def _upstream_statuses():
+    if _shared is None:
+        return {"metadata": _sa_email_cache.status, "adc": _credentials.status}
+    record = _shared.snapshot()
+    if record is None:
+        return {"metadata": "pending", "adc": "pending"}
+    return record["upstreams"]
+
+
 @app.route("/whoami")
 def who_am_i():
-    try:
-        credentials, project = google.auth.default()
-        try:
-            credentials.refresh(Request())
-        except Exception:
-            pass
-        sa_email_adc = getattr(credentials, "service_account_email", None)
-        sa_email_meta = _metadata_sa_email()
-        identity = {
-            "status": "Success - Running on Cloud",
-            "project_id": project,
-            "identity_type": "Service Account",
-            "sa_email_from_adc": sa_email_adc,
-            "sa_email_from_metadata": sa_email_meta,
-            "is_credentials_valid": getattr(credentials, "valid", False),
-        }
-    except Exception as e:
-        identity = {
-            "status": "Failure - Credentials or SDK Issue",
-            "error_detail": str(e),
-        }
-
-    return jsonify(identity)
+    return jsonify(views.whoami_body(*_identity()))
 
 
 @app.route("/")
 def hello_world():
     """Example Hello World route."""
-    name = os.environ.get("NAME", "World")
-    safe_name = html.escape(name)
-    py_ver = sys.version.split(" ")[0]
-    flask_ver = flask_pkg.__version__
-    sa_meta = _metadata_sa_email() or "-"
-    service = os.environ.get("K_SERVICE") or "-"
-    revision = os.environ.get("K_REVISION") or "-"
-    server = "cloud" if os.environ.get("K_SERVICE") else "dev"
-    try:
-        credentials, project = google.auth.default()
-        try:
-            credentials.refresh(Request())
-        except Exception:
-            pass
-        project_id = project or (
-            os.environ.get("GOOGLE_CLOUD_PROJECT")
-            or os.environ.get("GCP_PROJECT")
-            or "-"
-        )
-        sa_adc = getattr(credentials, "service_account_email", None) or "-"
-        cred_valid = getattr(credentials, "valid", False)
-    except Exception:
-        project_id = (
-            os.environ.get("GOOGLE_CLOUD_PROJECT")
-            or os.environ.get("GCP_PROJECT")
-            or "-"
+    values = views.index_values(*_identity())
+    etag = _INDEX.etag(values)
+    encoding = compression.negotiate(request.accept_encodings)
+    if request.if_none_match.contains_weak(etag):
+        resp = Response(status=304)
+    elif encoding is not None:
+        body = _compressed.get(etag, encoding, lambda: _render_index(values, encoding))
+        resp = Response(body, mimetype="text/html")
+    else:
+        resp = Response(_render_plain(values), mimetype="text/html")
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "no-cache"
+    if encoding is not None and resp.status_code == 200:
+        resp.headers["Content-Encoding"] = encoding
+        compression.mark_encoded(resp)
+    return resp
+
+
+@_RENDER_INDEX.timed
+def _render_index(values, encoding):
+    with accesslog.timed("render"):
+        return views.render_index(_INDEX, values, encoding)
+
+
+@app.route("/healthz")
+def healthz():
+    """存活探针：进程能响应即可，不读任何上游状态。"""
+    return Response("ok\n", mimetype="text/plain", headers=_NO_STORE)
+
+
+@app.route("/readyz")
+def readyz():
+    """就绪探针：只看内存中的预热 / 上游状态，从不发起上游请求。"""
+    # 非 preload 模式下由探针触发后台预热，本身不等待
+    for source in _IDENTITY_SOURCES.values():
+        source.start()
+    body, code = views.readiness(_upstream_statuses())
+    return jsonify(body), code, _NO_STORE
+
+
+@app.route("/objects/<path:name>")
+def get_object(name):
+    """流式转发 GCS 对象，支持 Range 与条件请求。"""
+    return objects.serve(request, name)
+
+
+@app.route("/metrics")
+def prometheus_metrics():
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+
+@app.before_request
+def _start_request_timer():
+    rule = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+    g.metrics_route = rule
+    g.metrics_start = time.perf_counter()
+    g.timings = accesslog.begin()
+    metrics.REQUESTS_IN_FLIGHT.labels(rule).inc()
+
+
+@app.teardown_request
+def _observe_request(exc):
+    rule = g.pop("metrics_route", None)
+    if rule is None:
+        return
+    elapsed = time.perf_counter() - g.pop("metrics_start")
+    metrics.REQUEST_LATENCY.labels(rule).observe(elapsed)
+    metrics.REQUESTS_IN_FLIGHT.labels(rule).dec()
+    if _ACCESS_LOG:
+        status = 500 if exc is not None else g.pop("status", 500)
+        accesslog.LOG.emit(
+            accesslog.entry(
+                request.method,
+                request.url,
+                status,
+                elapsed,
+                g.pop("timings"),
+                request.headers,
+                g.pop("response_size", None),
+                request.remote_addr,
+            )
         )
-        sa_adc = "-"
-        cred_valid = False
-    return f"""<!doctype html>
-<html lang="zh-CN">
-<head>
-  <meta charset="utf-8" />
-  <meta name="viewport" content="width=device-width, initial-scale=1" />
-  <title>Hello {safe_name}</title>
-  <style>
-    :root {{
-      --bg: #f6f8fa;
-      --card: #ffffff;
-      --text: #24292f;
-      --muted: #57606a;
-      --accent: #2da44e;
-      --border: rgba(27,31,36,0.15);
-      --grid: rgba(27,31,36,0.06);
-      --shadow: rgba(0,0,0,0.08);
-    }}
-    @media (prefers-color-scheme: dark) {{
-      :root {{
-        --bg: #0b0f14;
-        --card: #11161d;
-        --text: #e6edf3;
-        --muted: #8b949e;
-        --accent: #3fb950;
-        --border: rgba(99,110,123,0.25);
-        --grid: rgba(99,110,123,0.15);
-        --shadow: rgba(0,0,0,0.35);
-      }}
-    }}
-    * {{ box-sizing: border-box; }}
-    body {{
-      margin: 0;
-      min-height: 100vh;
-      display: flex;
-      flex-direction: column;
-      background:
-        radial-gradient(1200px 600px at 10% 10%, rgba(45,164,78,0.06), transparent 60%),
-        radial-gradient(1000px 500px at 90% 15%, rgba(99,110,123,0.08), transparent 60%),
-        linear-gradient(to right, var(--grid) 1px, transparent 1px),
-        linear-gradient(to bottom, var(--grid) 1px, transparent 1px);
-      background-size: auto, auto, 24px 24px, 24px 24px;
-      background-color: var(--bg);
-      color: var(--text);
-      font-family: ui-monospace, SFMono-Regular, Menlo, Monaco, Consolas,
-                   "Liberation Mono", "Courier New", monospace;
-    }}
-    .container {{
-      width: min(960px, 94vw);
-      margin: 20px auto;
-      padding: 0 8px 28px;
-    }}
-    header {{
-      position: sticky;
-      top: 0;
-      backdrop-filter: saturate(1.2) blur(6px);
-      background: color-mix(in srgb, var(--bg) 80%, transparent);
-      border-bottom: 1px solid var(--border);
-    }}
-    .bar {{
-      width: min(960px, 94vw);
-      margin: 0 auto;
-      padding: 12px 8px;
-      display: flex;
-      align-items: center;
-      justify-content: space-between;
-    }}
-    .brand {{
-      font-weight: 600;
-      letter-spacing: 0.3px;
-    }}
-    .brand .dot {{
-      color: var(--accent);
-    }}
-    .tag {{
-      padding: 2px 8px;
-      border: 1px solid var(--border);
-      border-radius: 999px;
-      font-size: 12px;
-      color: var(--muted);
-    }}
-    .hero {{
-      margin-top: 24px;
-      background: var(--card);
-      border: 1px solid var(--border);
-      border-radius: 12px;
-      padding: 24px;
-      box-shadow: 0 10px 28px var(--shadow);
-    }}
-    h1 {{
-      margin: 0 0 10px;
-      font-size: 30px;
-      letter-spacing: 0.2px;
-    }}
-    .badge {{
-      display: inline-block;
-      margin-left: 10px;
-      padding: 2px 8px;
-      border-radius: 999px;
-      background: rgba(63,185,80,0.12);
-      border: 1px solid rgba(63,185,80,0.35);
-      color: var(--accent);
-      font-size: 12px;
-    }}
-    .sub {{
-      margin: 0;
-      color: var(--muted);
-      font-size: 14px;
-    }}
-    .grid {{
-      margin-top: 16px;
-      display: grid;
-      grid-template-columns: repeat(auto-fit, minmax(240px, 1fr));
-      gap: 16px;
-    }}
-    .card {{
-      background: var(--card);
-      border: 1px solid var(--border);
-      border-radius: 10px;
-      padding: 16px;
-      box-shadow: 0 6px 18px var(--shadow);
-    }}
-    pre {{
-      margin: 0;
-      padding: 12px 14px;
-      border-radius: 8px;
-      border: 1px solid var(--border);
-      background: rgba(0,0,0,0.06);
-      overflow: auto;
-    }}
-    .footer {{
-      margin-top: 14px;
-      font-size: 12px;
-      color: var(--muted);
-    }}
-    a {{ color: var(--accent); text-decoration: none; }}
-    a:hover {{ text-decoration: underline; }}
-  </style>
-</head>
-<body>
-  <header>
-    <div class="bar">
-      <div class="brand">helloworld<span class="dot">.</span>app</div>
-      <div class="tag">monospace · clean · dev</div>
-    </div>
-  </header>
-  <div class="container">
-    <section class="hero">
-      <h1>Hello, {safe_name}! <span class="badge">Flask</span></h1>
-      <p class="sub">简洁但不单调</p>
-      <div class="grid">
-        <div class="card">
-          <div class="sub">Request</div>
-          <pre>GET /
-200 OK
-Name: {safe_name}</pre>
-        </div>
-        <div class="card">
-          <div class="sub">Environment</div>
-          <pre>Python: {py_ver}
-Flask: {flask_ver}
-Server: {server}
-Service: {service}
-Revision: {revision}</pre>
-        </div>
-        <div class="card">
-          <div class="sub">Identity</div>
-          <pre>Project: {project_id}
-SA(meta): {sa_meta}
-SA(ADC): {sa_adc}
-Creds Valid: {str(cred_valid)}</pre>
-        </div>
-        <div class="card">
-          <div class="sub">Quick Links</div>
-          <pre>Docs: https://flask.palletsprojects.com/
-Gunicorn: https://gunicorn.org/
-Werkzeug: https://werkzeug.palletsprojects.com/</pre>
-        </div>
-      </div>
-      <p class="footer">Powered by Flask · Python</p>
-    </section>
-  </div>
-</body>
-</html>"""
+
+
+@app.after_request
+def _compress_response(resp):
+    resp = compression.apply(resp, request.accept_encodings, _compressed)
+    g.status = resp.status_code
+    g.response_size = resp.content_length
+    return resp
+
+
+def warmup():
+    """预热：导入认证栈并解析一次身份。
+
+    配合 gunicorn --preload 在 master 中执行，worker fork 后以写时复制共享结果。
+    """
+    import google.auth.transport.requests  # noqa: F401
+
+    # 各身份源互不依赖，在共享线程池里并行加载并共享同一个截止时间
+    deadline = Deadline(_UPSTREAM_DEADLINE)
+    identity.resolve_all((_sa_email_cache, _credentials), deadline)
+    if _shared is not None:
+        # 本地源已加载，这里只发布到共享文件；不经 POOL，避免在池任务里再向池提交
+        _shared.warmup(deadline=deadline)
+    # fork 前收起线程池，master 里不留线程
+    identity.POOL.shutdown()
+    # 把预热产生的对象移出 GC 跟踪，避免 worker 里的 GC 触碰这些页面导致复制
+    gc.freeze()
+
+
+def create_app():
+    """gunicorn 应用工厂：main:create_app()，先预热再返回 app。"""
+    warmup()
+    return app
 
 
 if __name__ == "__main__":
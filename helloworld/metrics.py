@@ -0,0 +1,261 @@
+"""进程内指标：直方图 / 仪表盘 / 计数器，按 Prometheus 文本格式导出。
+
+记录路径不加锁：每个线程写自己的 array 分片，导出时再汇总。
+"""
+
+import array
+import bisect
+import collections
+import functools
+import itertools
+import threading
+import time
+import weakref
+
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REGISTRY = []
+
+
+class _ShardToken:
+    """线程局部里的占位对象；线程退出时随 threading.local 一起释放，触发分片回收。"""
+
+    __slots__ = ("__weakref__",)
+
+
+class _Sharded:
+    """每个线程一个定长 array 分片；首次写入时登记，之后只做原地加法。
+
+    线程退出后它的分片并入 _retired（每线程一个请求的服务器会不停创建新线程，
+    分片不回收的话内存和 totals() 的耗时都会无限增长）。
+    """
+
+    def __init__(self, width):
+        self._width = width
+        self._local = threading.local()
+        self._shards = {}
+        self._retired = array.array("d", bytes(8 * width))
+        # finalizer 可能在任意线程的 GC 中运行，只往这里追加 key，由持锁的一方合并
+        self._dead = collections.deque()
+        self._keys = itertools.count()
+        self._lock = threading.Lock()
+
+    def shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = array.array("d", bytes(8 * self._width))
+            token = _ShardToken()
+            key = next(self._keys)
+            with self._lock:
+                self._reap()
+                self._shards[key] = shard
+            weakref.finalize(token, self._dead.append, key)
+            self._local.token = token
+            self._local.shard = shard
+            return shard
+
+    def _reap(self):
+        # 调用方持有 _lock
+        while self._dead:
+            shard = self._shards.pop(self._dead.popleft(), None)
+            if shard is not None:
+                for i, v in enumerate(shard):
+                    self._retired[i] += v
+
+    def totals(self):
+        with self._lock:
+            self._reap()
+            shards = list(self._shards.values())
+            out = list(self._retired)
+        for shard in shards:
+            for i, v in enumerate(shard):
+                out[i] += v
+        return out
+
+
+class _HistogramChild(_Sharded):
+    def __init__(self, bounds):
+        # 各 bucket 计数 + (+Inf) + sum + count
+        super().__init__(len(bounds) + 3)
+        self._bounds = bounds
+        self._sum = len(bounds) + 1
+        self._count = len(bounds) + 2
+
+    def observe(self, value):
+        shard = self.shard()
+        shard[bisect.bisect_left(self._bounds, value)] += 1
+        shard[self._sum] += value
+        shard[self._count] += 1
+
+    def timed(self, fn):
+        """装饰器：记录 fn 每次调用的耗时（秒），异常也会计入。"""
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.observe(time.perf_counter() - start)
+
+        return wrapper
+
+
+class _GaugeChild(_Sharded):
+    def __init__(self):
+        super().__init__(1)
+
+    def inc(self, amount=1):
+        self.shard()[0] += amount
+
+    def dec(self, amount=1):
+        self.shard()[0] -= amount
+
+
+class _CounterChild(_Sharded):
+    def __init__(self):
+        super().__init__(1)
+
+    def inc(self, amount=1):
+        self.shard()[0] += amount
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def labels(self, *values):
+        """返回某组 label 的子指标；调用方应在模块级缓存结果，避免请求路径查表。"""
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._children[values] = self._new_child()
+        return child
+
+    def _label_str(self, values, extra=()):
+        pairs = list(zip(self.labelnames, values)) + list(extra)
+        if not pairs:
+            return ""
+        body = ",".join(f'{k}="{_escape(str(v))}"' for k, v in pairs)
+        return "{" + body + "}"
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        with self._lock:
+            children = list(self._children.items())
+        for values, child in children:
+            lines.extend(self._render_child(values, child))
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def _render_child(self, values, child):
+        totals = child.totals()
+        cumulative = 0.0
+        lines = []
+        for i, bound in enumerate(self.buckets + (float("inf"),)):
+            cumulative += totals[i]
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            labels = self._label_str(values, [("le", le)])
+            lines.append(f"{self.name}_bucket{labels} {_num(cumulative)}")
+        labels = self._label_str(values)
+        lines.append(f"{self.name}_sum{labels} {_num(totals[child._sum])}")
+        lines.append(f"{self.name}_count{labels} {_num(totals[child._count])}")
+        return lines
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def _render_child(self, values, child):
+        return [f"{self.name}{self._label_str(values)} {_num(child.totals()[0])}"]
+
+
+class Counter(Gauge):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _num(value):
+    return str(int(value)) if value == int(value) else repr(value)
+
+
+def render():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+REQUEST_LATENCY = Histogram(
+    "helloworld_request_duration_seconds",
+    "Request latency by route.",
+    ["route"],
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "helloworld_requests_in_flight",
+    "Requests currently being served.",
+    ["route"],
+)
+UPSTREAM_LATENCY = Histogram(
+    "helloworld_upstream_duration_seconds",
+    "Latency of calls to the metadata server and ADC.",
+    ["upstream"],
+)
+RENDER_LATENCY = Histogram(
+    "helloworld_render_duration_seconds",
+    "Time spent rendering response bodies.",
+    ["route"],
+)
+ACCESS_LOG_DROPPED = Counter(
+    "helloworld_access_log_dropped_total",
+    "Access log entries dropped because the log queue was full.",
+)
@@ -0,0 +1,169 @@
+"""/objects/<path>：把 OBJECTS_BUCKET 中的 GCS 对象按固定大小分块流式转发。
+
+每个请求只在内存里保留一个分块（OBJECTS_CHUNK_BYTES），与对象大小无关。
+支持单区间 Range / If-Range，以及基于对象 ETag、generation 和更新时间的条件请求；
+?generation=N 读取指定版本。下载固定在元数据里的 generation 上，
+传输中途对象被覆盖也不会混读。
+storage.Client 每个进程一个，底层连接池大小由 OBJECTS_POOL_SIZE 控制。
+设置 STORAGE_EMULATOR_HOST 时连接本地替身（bench/fake_gcs.py）。
+"""
+
+import os
+import threading
+import time
+
+from flask import Response
+from werkzeug.http import http_date
+
+import accesslog
+import metrics
+
+BUCKET = os.environ.get("OBJECTS_BUCKET")
+CHUNK_BYTES = int(os.environ.get("OBJECTS_CHUNK_BYTES", 1024 * 1024))
+POOL_SIZE = int(os.environ.get("OBJECTS_POOL_SIZE", 10))
+TIMEOUT = float(os.environ.get("OBJECTS_TIMEOUT", 30))
+
+_GCS_METADATA = metrics.UPSTREAM_LATENCY.labels("gcs_metadata")
+_GCS_CHUNK = metrics.UPSTREAM_LATENCY.labels("gcs_chunk")
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def client():
+    """本进程共享的 storage.Client；fork 之后按进程重新创建，不复用父进程的连接。"""
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client_pid != pid:
+        with _client_lock:
+            if _client_pid != pid:
+                _client, _client_pid = _create_client(), pid
+    return _client
+
+
+def _create_client():
+    """自己构造 AuthorizedSession 并挂上 POOL_SIZE 大小的连接池，再交给 storage.Client。"""
+    from google.auth.transport.requests import AuthorizedSession
+    from google.cloud import storage
+    from requests.adapters import HTTPAdapter
+
+    if os.environ.get("STORAGE_EMULATOR_HOST"):
+        # 本地替身不校验凭证，和 storage.Client 自己的模拟器模式一样用匿名凭证
+        from google.auth.credentials import AnonymousCredentials
+
+        credentials, project = AnonymousCredentials(), None
+    else:
+        import google.auth
+
+        credentials, project = google.auth.default(scopes=storage.Client.SCOPE)
+    session = AuthorizedSession(credentials)
+    adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+    for prefix in ("https://", "http://"):
+        session.mount(prefix, adapter)
+    return storage.Client(project=project, credentials=credentials, _http=session)
+
+
+def _plain(status, text, headers=None):
+    return Response(text + "\n", status, headers, mimetype="text/plain")
+
+
+def serve(request, name):
+    """处理一次 GET/HEAD /objects/<name>。"""
+    if not BUCKET:
+        return _plain(404, "objects proxy is not configured")
+    from google.api_core import exceptions
+
+    generation = request.args.get("generation", type=int)
+    try:
+        with accesslog.timed("gcs"):
+            blob = _GCS_METADATA.timed(client().bucket(BUCKET).get_blob)(
+                name, generation=generation, timeout=TIMEOUT
+            )
+    except exceptions.NotFound:
+        blob = None
+    except exceptions.GoogleAPICallError as e:
+        return _plain(502, f"upstream error: {e.code}")
+    if blob is None:
+        return _plain(404, "not found")
+
+    headers = {
+        "ETag": f'"{blob.etag}"',
+        "Accept-Ranges": "bytes",
+        "X-Goog-Generation": str(blob.generation),
+        "Cache-Control": blob.cache_control or "no-cache",
+    }
+    if blob.updated is not None:
+        headers["Last-Modified"] = http_date(blob.updated)
+    precondition = _check_conditions(request, blob)
+    if precondition is not None:
+        return Response(status=precondition, headers=headers)
+
+    size = blob.size
+    start, stop, status = 0, size, 200
+    if request.range is not None and _if_range_matches(request, blob):
+        bounds = request.range.range_for_length(size)
+        if bounds is not None:
+            start, stop = bounds
+            status = 206
+            headers["Content-Range"] = f"bytes {start}-{stop - 1}/{size}"
+        elif len(request.range.ranges) == 1:
+            headers["Content-Range"] = f"bytes */{size}"
+            return Response(status=416, headers=headers)
+        # 多区间请求不支持，按 RFC 9110 忽略 Range，返回完整对象
+    if blob.content_encoding:
+        headers["Content-Encoding"] = blob.content_encoding
+    headers["Content-Length"] = str(stop - start)
+    return Response(
+        _stream(blob, start, stop),
+        status,
+        headers,
+        content_type=blob.content_type or "application/octet-stream",
+        direct_passthrough=True,
+    )
+
+
+def _check_conditions(request, blob):
+    """返回 304 / 412，条件满足（应返回正文）时返回 None。"""
+    etag = blob.etag
+    if "If-Match" in request.headers and not request.if_match.contains(etag):
+        return 412
+    if request.if_unmodified_since is not None and blob.updated is not None:
+        if blob.updated.replace(microsecond=0) > request.if_unmodified_since:
+            return 412
+    if request.if_none_match:
+        return 304 if request.if_none_match.contains_weak(etag) else None
+    if request.if_modified_since is not None and blob.updated is not None:
+        if blob.updated.replace(microsecond=0) <= request.if_modified_since:
+            return 304
+    return None
+
+
+def _if_range_matches(request, blob):
+    if_range = request.if_range
+    if if_range.etag is not None:
+        return if_range.etag == blob.etag
+    if if_range.date is not None:
+        updated = blob.updated
+        return updated is not None and updated.replace(microsecond=0) == if_range.date
+    return True
+
+
+def _stream(blob, start, stop):
+    """按 CHUNK_BYTES 逐块读取 [start, stop)；任何时刻只持有一个分块。"""
+    remaining = stop - start
+    if remaining <= 0:
+        return
+    # raw_download：按存储的字节原样转发（gzip 对象不做解压转码），偏移与 size 一致
+    with blob.open(
+        "rb", chunk_size=CHUNK_BYTES, raw_download=True, timeout=TIMEOUT
+    ) as reader:
+        reader.seek(start)
+        while remaining > 0:
+            begin = time.perf_counter()
+            data = reader.read(min(CHUNK_BYTES, remaining))
+            _GCS_CHUNK.observe(time.perf_counter() - begin)
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
@@ -0,0 +1,245 @@
+"""首页模板：静态外壳和 CSS 在导入时预编译，请求时只填充动态字段。"""
+
+import hashlib
+import html
+import re
+
+import compression
+
+_FIELD = re.compile(r"\$\{(\w+)\}")
+
+
+class PageTemplate:
+    """把 ${field} 占位符预先切分成静态片段，渲染时只做一次 join。"""
+
+    def __init__(self, source):
+        self.source = source
+        parts = _FIELD.split(source)
+        self._static = parts[0::2]
+        self._slots = parts[1::2]
+        self.fields = tuple(dict.fromkeys(self._slots))
+        self._static_raw = [part.encode() for part in self._static]
+        self._static_gz = [compression.deflate_fragment(b) for b in self._static_raw]
+        self.digest = hashlib.sha256(source.encode()).hexdigest()[:16]
+
+    def bind(self, **values):
+        """把进程内不变的字段提前填入，返回新的模板。"""
+        source = _FIELD.sub(
+            lambda m: (
+                html.escape(str(values[m.group(1)]))
+                if m.group(1) in values
+                else m.group(0)
+            ),
+            self.source,
+        )
+        return PageTemplate(source)
+
+    def render(self, values):
+        out = [self._static[0]]
+        for field, static in zip(self._slots, self._static[1:]):
+            out.append(html.escape(str(values[field])))
+            out.append(static)
+        return "".join(out)
+
+    def render_gzip(self, values):
+        """直接产出 gzip 正文：静态片段用预压缩块，动态字段原样写入。"""
+        pieces = [(self._static_raw[0], self._static_gz[0])]
+        for field, raw, gz in zip(
+            self._slots, self._static_raw[1:], self._static_gz[1:]
+        ):
+            pieces.append((html.escape(str(values[field])).encode(), None))
+            pieces.append((raw, gz))
+        return compression.splice_gzip(pieces)
+
+    def etag(self, values):
+        """按模板版本 + 动态字段计算 ETag，命中 304 时无需渲染正文。"""
+        h = hashlib.sha256(self.digest.encode())
+        for field in self.fields:
+            h.update(b"\0")
+            h.update(str(values[field]).encode())
+        return h.hexdigest()[:32]
+
+
+INDEX = PageTemplate("""<!doctype html>
+<html lang="zh-CN">
+<head>
+  <meta charset="utf-8" />
+  <meta name="viewport" content="width=device-width, initial-scale=1" />
+  <title>Hello ${name}</title>
+  <style>
+    :root {
+      --bg: #f6f8fa;
+      --card: #ffffff;
+      --text: #24292f;
+      --muted: #57606a;
+      --accent: #2da44e;
+      --border: rgba(27,31,36,0.15);
+      --grid: rgba(27,31,36,0.06);
+      --shadow: rgba(0,0,0,0.08);
+    }
+    @media (prefers-color-scheme: dark) {
+      :root {
+        --bg: #0b0f14;
+        --card: #11161d;
+        --text: #e6edf3;
+        --muted: #8b949e;
+        --accent: #3fb950;
+        --border: rgba(99,110,123,0.25);
+        --grid: rgba(99,110,123,0.15);
+        --shadow: rgba(0,0,0,0.35);
+      }
+    }
+    * { box-sizing: border-box; }
+    body {
+      margin: 0;
+      min-height: 100vh;
+      display: flex;
+      flex-direction: column;
+      background:
+        radial-gradient(1200px 600px at 10% 10%, rgba(45,164,78,0.06), transparent 60%),
+        radial-gradient(1000px 500px at 90% 15%, rgba(99,110,123,0.08), transparent 60%),
+        linear-gradient(to right, var(--grid) 1px, transparent 1px),
+        linear-gradient(to bottom, var(--grid) 1px, transparent 1px);
+      background-size: auto, auto, 24px 24px, 24px 24px;
+      background-color: var(--bg);
+      color: var(--text);
+      font-family: ui-monospace, SFMono-Regular, Menlo, Monaco, Consolas,
+                   "Liberation Mono", "Courier New", monospace;
+    }
+    .container {
+      width: min(960px, 94vw);
+      margin: 20px auto;
+      padding: 0 8px 28px;
+    }
+    header {
+      position: sticky;
+      top: 0;
+      backdrop-filter: saturate(1.2) blur(6px);
+      background: color-mix(in srgb, var(--bg) 80%, transparent);
+      border-bottom: 1px solid var(--border);
+    }
+    .bar {
+      width: min(960px, 94vw);
+      margin: 0 auto;
+      padding: 12px 8px;
+      display: flex;
+      align-items: center;
+      justify-content: space-between;
+    }
+    .brand {
+      font-weight: 600;
+      letter-spacing: 0.3px;
+    }
+    .brand .dot {
+      color: var(--accent);
+    }
+    .tag {
+      padding: 2px 8px;
+      border: 1px solid var(--border);
+      border-radius: 999px;
+      font-size: 12px;
+      color: var(--muted);
+    }
+    .hero {
+      margin-top: 24px;
+      background: var(--card);
+      border: 1px solid var(--border);
+      border-radius: 12px;
+      padding: 24px;
+      box-shadow: 0 10px 28px var(--shadow);
+    }
+    h1 {
+      margin: 0 0 10px;
+      font-size: 30px;
+      letter-spacing: 0.2px;
+    }
+    .badge {
+      display: inline-block;
+      margin-left: 10px;
+      padding: 2px 8px;
+      border-radius: 999px;
+      background: rgba(63,185,80,0.12);
+      border: 1px solid rgba(63,185,80,0.35);
+      color: var(--accent);
+      font-size: 12px;
+    }
+    .sub {
+      margin: 0;
+      color: var(--muted);
+      font-size: 14px;
+    }
+    .grid {
+      margin-top: 16px;
+      display: grid;
+      grid-template-columns: repeat(auto-fit, minmax(240px, 1fr));
+      gap: 16px;
+    }
+    .card {
+      background: var(--card);
+      border: 1px solid var(--border);
+      border-radius: 10px;
+      padding: 16px;
+      box-shadow: 0 6px 18px var(--shadow);
+    }
+    pre {
+      margin: 0;
+      padding: 12px 14px;
+      border-radius: 8px;
+      border: 1px solid var(--border);
+      background: rgba(0,0,0,0.06);
+      overflow: auto;
+    }
+    .footer {
+      margin-top: 14px;
+      font-size: 12px;
+      color: var(--muted);
+    }
+    a { color: var(--accent); text-decoration: none; }
+    a:hover { text-decoration: underline; }
+  </style>
+</head>
+<body>
+  <header>
+    <div class="bar">
+      <div class="brand">helloworld<span class="dot">.</span>app</div>
+      <div class="tag">monospace · clean · dev</div>
+    </div>
+  </header>
+  <div class="container">
+    <section class="hero">
+      <h1>Hello, ${name}! <span class="badge">Flask</span></h1>
+      <p class="sub">简洁但不单调</p>
+      <div class="grid">
+        <div class="card">
+          <div class="sub">Request</div>
+          <pre>GET /
+200 OK
+Name: ${name}</pre>
+        </div>
+        <div class="card">
+          <div class="sub">Environment</div>
+          <pre>Python: ${python_version}
+Flask: ${flask_version}
+Server: ${server}
+Service: ${service}
+Revision: ${revision}</pre>
+        </div>
+        <div class="card">
+          <div class="sub">Identity</div>
+          <pre>Project: ${project_id}
+SA(meta): ${sa_meta}
+SA(ADC): ${sa_adc}
+Creds Valid: ${cred_valid}</pre>
+        </div>
+        <div class="card">
+          <div class="sub">Quick Links</div>
+          <pre>Docs: https://flask.palletsprojects.com/
+Gunicorn: https://gunicorn.org/
+Werkzeug: https://werkzeug.palletsprojects.com/</pre>
+        </div>
+      </div>
+      <p class="footer">Powered by Flask · Python</p>
+    </section>
+  </div>
+</body>
+</html>""")
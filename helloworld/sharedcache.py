@@ -0,0 +1,247 @@
+"""跨 worker 共享的身份缓存：一个内存映射文件 + seqlock。
+
+同一台机器上的所有 worker 映射同一个文件。用 flock 选出一个 leader，
+只有 leader 运行本地的身份源（后台刷新 metadata / ADC），并把结果发布到文件；
+其它 worker 只读文件，不发起上游请求，读路径不加锁。
+leader 退出时 flock 随之释放，其余 worker 在下一个检查周期内接手。
+上游调用量因此与 worker 数量无关。
+
+文件布局（小端）：
+    0   uint64  seq     写入期间为奇数，写完为偶数；0 表示尚未发布
+    8   uint32  length  payload 字节数
+    16  bytes   payload JSON
+"""
+
+import contextlib
+import fcntl
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+SIZE = 4096
+_HEADER = struct.Struct("<QI")
+_SEQ = struct.Struct("<Q")
+_MAX_PAYLOAD = SIZE - _HEADER.size
+
+
+def _base_dir():
+    return "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+
+
+def _prefix():
+    return f"helloworld-identity-{os.getuid()}-"
+
+
+def default_path():
+    """按进程组区分文件：gunicorn master 与 worker 同组，重启后换新文件，不读旧值。"""
+    return os.path.join(_base_dir(), f"{_prefix()}{os.getpgid(0)}")
+
+
+def remove(path=None):
+    """删除共享文件；只在 gunicorn master 退出时调用（其它 worker 可能仍在用）。"""
+    with contextlib.suppress(FileNotFoundError):
+        os.unlink(path or default_path())
+
+
+def remove_stale():
+    """删除进程组已经不存在的文件（上次没有正常退出、没执行 remove() 时留下的）。"""
+    base, prefix = _base_dir(), _prefix()
+    for name in os.listdir(base):
+        if not name.startswith(prefix):
+            continue
+        try:
+            pgid = int(name[len(prefix) :])
+        except ValueError:
+            continue
+        try:
+            os.killpg(pgid, 0)
+        except ProcessLookupError:
+            remove(os.path.join(base, name))
+        except PermissionError:
+            pass
+
+
+class SharedRegion:
+    """映射到文件的固定大小区域。单写者（持有 flock 的进程）、多读者。"""
+
+    def __init__(self, path):
+        self.path = path
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if os.fstat(fd).st_size < SIZE:
+                os.ftruncate(fd, SIZE)
+            self._mm = mmap.mmap(fd, SIZE)
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+        self._seq = 0
+        self._value = None
+
+    def try_lock(self):
+        """尝试成为 leader；flock 属于本进程打开的文件，进程退出时自动释放。"""
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    def unlock(self):
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def read(self, retries=100):
+        """无锁读取最新 payload（已解析的 dict），尚未发布时为 None。
+
+        seq 没变时直接返回上次解析的结果；读到写入中的数据时重试。
+        """
+        mm = self._mm
+        for _ in range(retries):
+            seq = _SEQ.unpack_from(mm, 0)[0]
+            if seq == self._seq:
+                return self._value
+            if seq & 1:
+                time.sleep(0)
+                continue
+            length = _HEADER.unpack_from(mm, 0)[1]
+            payload = mm[_HEADER.size : _HEADER.size + min(length, _MAX_PAYLOAD)]
+            if _SEQ.unpack_from(mm, 0)[0] != seq:
+                continue
+            try:
+                self._value = json.loads(payload)
+            except ValueError:
+                continue
+            self._seq = seq
+            return self._value
+        return self._value
+
+    def write(self, value):
+        """发布新值；调用方必须持有 flock。"""
+        payload = json.dumps(value, separators=(",", ":")).encode()
+        if len(payload) > _MAX_PAYLOAD:
+            raise ValueError("shared identity payload too large")
+        mm = self._mm
+        seq = _SEQ.unpack_from(mm, 0)[0]
+        if seq & 1:
+            # 上一个 leader 写到一半退出了
+            seq += 1
+        _SEQ.pack_into(mm, 0, seq + 1)
+        mm[_HEADER.size : _HEADER.size + len(payload)] = payload
+        _HEADER.pack_into(mm, 0, seq + 1, len(payload))
+        _SEQ.pack_into(mm, 0, seq + 2)
+
+    def close(self):
+        self._mm.close()
+        os.close(self._fd)
+
+
+class SharedIdentity:
+    """把本地身份源（identity.TTLCache / CredentialsManager）包装成跨 worker 共享的源。
+
+    sources 只在 leader 中运行；collect() 从这些本地源生成要发布的 dict。
+    对外提供与本地源相同的 loaded / refreshing / start / wait / warmup 接口，
+    可以直接交给 identity.resolve_all。
+    """
+
+    def __init__(self, sources, collect, path=None, interval=1.0):
+        self._sources = tuple(sources)
+        self._collect = collect
+        self.path = path or default_path()
+        self.interval = interval
+        self._region = None
+        self._pid = None
+        self._leader = False
+        self._started = False
+        self._lock = threading.Lock()
+
+    def _get_region(self):
+        # fork 之后每个进程重新打开文件，flock 才不会在父子进程间共享
+        pid = os.getpid()
+        if self._pid != pid:
+            with self._lock:
+                if self._pid != pid:
+                    self._region = SharedRegion(self.path)
+                    self._leader = False
+                    self._started = False
+                    self._pid = pid
+        return self._region
+
+    @property
+    def is_leader(self):
+        return self._pid == os.getpid() and self._leader
+
+    def snapshot(self):
+        """当前共享值（dict），尚未发布时为 None；只读映射内存。"""
+        return self._get_region().read()
+
+    @property
+    def loaded(self):
+        return self.snapshot() is not None
+
+    @property
+    def refreshing(self):
+        return self._pid == os.getpid() and self._started
+
+    def start(self):
+        """拉起本进程的 leader 选举线程（不阻塞、不做 I/O）。"""
+        self._get_region()
+        if self._started:
+            return
+        with self._lock:
+            if self._started:
+                return
+            threading.Thread(
+                target=self._run, name="shared-identity", daemon=True
+            ).start()
+            self._started = True
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.loaded:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def warmup(self, timeout=None, deadline=None):
+        """在本进程同步加载本地源并发布一次（gunicorn preload 时由 master 调用）。
+
+        直接在调用线程里逐个 warmup，不向 identity.POOL 提交：本方法可能本身就跑在
+        POOL 的任务里，嵌套提交在线程数不够时会一直等到 deadline。需要并发时由调用方
+        先用 identity.resolve_all 加载本地源（见 main.warmup），这里只剩发布。
+        """
+        from breaker import Deadline
+
+        region = self._get_region()
+        deadline = deadline or Deadline(timeout or 5.0)
+        for source in self._sources:
+            if not source.loaded and deadline.remaining() > 0:
+                source.warmup(deadline.remaining(), deadline=deadline)
+        if region.try_lock():
+            try:
+                region.write({**self._collect(), "leader": os.getpid()})
+            finally:
+                region.unlock()
+        return self.snapshot()
+
+    def _run(self):
+        region = self._get_region()
+        while not region.try_lock():
+            time.sleep(self.interval)
+        self._leader = True
+        for source in self._sources:
+            source.start()
+        published = None
+        while True:
+            # 本地源首次加载完成前不发布，避免其它 worker 读到 pending 状态
+            if not all(source.loaded for source in self._sources):
+                time.sleep(0.01)
+                continue
+            value = {**self._collect(), "leader": os.getpid()}
+            if value != published:
+                region.write(value)
+                published = value
+            time.sleep(self.interval)
@@ -0,0 +1,63 @@
+"""与框架无关的视图逻辑，WSGI（main.py）和 ASGI（asgi.py）入口共用。"""
+
+import os
+
+import compression
+
+
+def index_values(creds, sa_meta):
+    """首页的动态字段；creds 为 identity.CredentialsState。"""
+    project_id = (
+        creds.project
+        or os.environ.get("GOOGLE_CLOUD_PROJECT")
+        or os.environ.get("GCP_PROJECT")
+        or "-"
+    )
+    return {
+        "name": os.environ.get("NAME", "World"),
+        "server": "cloud" if os.environ.get("K_SERVICE") else "dev",
+        "service": os.environ.get("K_SERVICE") or "-",
+        "revision": os.environ.get("K_REVISION") or "-",
+        "project_id": project_id,
+        "sa_meta": sa_meta or "-",
+        "sa_adc": creds.service_account_email or "-",
+        "cred_valid": str(creds.valid),
+    }
+
+
+def whoami_body(creds, sa_meta):
+    if creds.error is not None:
+        return {
+            "status": "Failure - Credentials or SDK Issue",
+            "error_detail": creds.error,
+        }
+    return {
+        "status": "Success - Running on Cloud",
+        "project_id": creds.project,
+        "identity_type": "Service Account",
+        "sa_email_from_adc": creds.service_account_email,
+        "sa_email_from_metadata": sa_meta,
+        "is_credentials_valid": creds.valid,
+    }
+
+
+def render_index(template, values, encoding):
+    # gzip 直接拼接预压缩的静态片段；其它编码整页压缩一次
+    if encoding == "gzip":
+        return template.render_gzip(values)
+    return compression.compress(template.render(values).encode(), encoding)
+
+
+def readiness(statuses):
+    """根据各上游状态（{name: status}）返回 (body, http_status)。
+
+    预热完成前返回 503；上游异常或熔断时仍返回 200，但标记为 degraded。
+    """
+    values = set(statuses.values())
+    if "pending" in values:
+        status, code = "starting", 503
+    elif {"failing", "open"} & values:
+        status, code = "degraded", 200
+    else:
+        status, code = "ready", 200
+    return {"status": status, "upstreams": statuses}, code
@@ -1,9 +1,11 @@
 from google.cloud import bigquery
 
+from bq_client import get_bqstorage_client, get_client
+
 # 初始化客户端
 # 替换为你的项目 ID
 PROJECT_ID = "webeye-internal-test"
-client = bigquery.Client(project=PROJECT_ID)
+client = get_client(PROJECT_ID)
 
 
 def run_parameterized_query(state_name, limit_count):
@@ -42,7 +44,8 @@ def run_parameterized_query(state_name, limit_count):
     # 💡 性能提示: to_dataframe() 默认尝试使用 BigQuery Storage API (二进制协议)。
     # 相比传统的 JSON REST API，下载大结果集时速度快非常多。
     # 现在的 to_dataframe 会自动尝试使用 google-cloud-bigquery-storage
-    df = query_job.to_dataframe()
+    # 但不传 bqstorage_client 时每次都新建并关闭一个 gRPC 连接，这里复用进程内共享的那个
+    df = query_job.to_dataframe(bqstorage_client=get_bqstorage_client())
 
     print("\n查询结果 (Top Rows):")
     print(df.head())
@@ -1,8 +1,10 @@
 from google.cloud import bigquery
 from google.cloud.exceptions import NotFound, Conflict
 
+from bq_client import get_client
+
 PROJECT_ID = "webeye-internal-test"
-client = bigquery.Client(project=PROJECT_ID)
+client = get_client(PROJECT_ID)
 
 # 定义我们要创建的 Dataset ID 和 Table ID
 DATASET_ID = f"{PROJECT_ID}.learning_bq"
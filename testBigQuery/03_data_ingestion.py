@@ -3,11 +3,13 @@ import pandas as pd
 import datetime
 import time
 
+from bq_client import get_client
+
 PROJECT_ID = "webeye-internal-test"
 DATASET_ID = f"{PROJECT_ID}.learning_bq"
 TABLE_ID = f"{DATASET_ID}.users"
 
-client = bigquery.Client(project=PROJECT_ID)
+client = get_client(PROJECT_ID)
 
 
 def insert_streaming_data():
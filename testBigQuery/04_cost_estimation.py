@@ -1,8 +1,10 @@
 from google.cloud import bigquery
 
+from bq_client import get_client
+
 # 初始化
 PROJECT_ID = "webeye-internal-test"
-client = bigquery.Client(project=PROJECT_ID)
+client = get_client(PROJECT_ID)
 
 
 def estimate_query_cost():
@@ -1,11 +1,13 @@
 from google.cloud import bigquery
 from google.cloud.exceptions import NotFound
 
+from bq_client import get_client
+
 PROJECT_ID = "webeye-internal-test"
 DATASET_ID = f"{PROJECT_ID}.learning_bq"
 TABLE_ID = f"{DATASET_ID}.users"
 
-client = bigquery.Client(project=PROJECT_ID)
+client = get_client(PROJECT_ID)
 
 
 def inspect_current_schema():
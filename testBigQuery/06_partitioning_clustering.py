@@ -1,12 +1,15 @@
 from google.cloud import bigquery
 import datetime
 
+from bq_client import get_client
+import table_reader
+
 PROJECT_ID = "webeye-internal-test"
 DATASET_ID = f"{PROJECT_ID}.learning_bq"
 # 我们将创建一个用来存储日志的新表
 TABLE_ID = f"{DATASET_ID}.app_logs"
 
-client = bigquery.Client(project=PROJECT_ID)
+client = get_client(PROJECT_ID)
 
 
 def create_partitioned_clustered_table():
@@ -109,6 +112,20 @@ def query_optimized():
     )
 
 
+def read_without_query():
+    """不跑查询作业，直接用 Storage Read API 并行读取需要的列和行"""
+    print("\n--- 演示 Storage Read API 直接读表 ---")
+    # 列裁剪 (selected_fields) 和行过滤 (row_restriction) 都在服务端完成，
+    # 多个 stream 由线程池并发读取；按读取字节计费，不产生查询作业
+    table = table_reader.read_table(
+        TABLE_ID,
+        columns=["log_id", "event_timestamp", "event_type"],
+        row_restriction="user_id = 1001",
+    )
+    print(f"读取 {table.num_rows} 行, {table.nbytes} 字节 (Arrow)")
+    print(table.to_pandas().head())
+
+
 if __name__ == "__main__":
     # 如果表已存在如果要重新演示，建议先去控制台删掉或者修改代码逻辑
     # client.delete_table(TABLE_ID, not_found_ok=True)
@@ -116,3 +133,4 @@ if __name__ == "__main__":
     create_partitioned_clustered_table()
     insert_data_into_specific_partition()
     query_optimized()
+    read_without_query()
@@ -1,11 +1,13 @@
 from google.cloud import bigquery
 import json
 
+from bq_client import get_client
+
 PROJECT_ID = "webeye-internal-test"
 DATASET_ID = f"{PROJECT_ID}.learning_bq"
 TABLE_ID = f"{DATASET_ID}.complex_orders"
 
-client = bigquery.Client(project=PROJECT_ID)
+client = get_client(PROJECT_ID)
 
 
 def create_complex_table():
@@ -1,10 +1,11 @@
-from google.cloud import bigquery
+from bq_client import get_bqstorage_client, get_client
+import frame_loader
 
 PROJECT_ID = "webeye-internal-test"
 DATASET_ID = f"{PROJECT_ID}.learning_bq"
 MODEL_ID = f"{DATASET_ID}.sample_kmeans_model"
 
-client = bigquery.Client(project=PROJECT_ID)
+client = get_client(PROJECT_ID)
 
 
 def train_kmeans_model():
@@ -65,9 +66,11 @@ def predict_using_model():
         ORDER BY total_views DESC
     """
 
-    df = client.query(query).to_dataframe()
+    # title 等字符串列用 Arrow / category 类型，整数列保持 int64（见 frame_loader.py）
+    df = frame_loader.load(client.query(query), get_bqstorage_client())
     print("预测结果 (前10行):")
     print(df)
+    print(f"DataFrame 内存占用: {frame_loader.memory_bytes(df)} 字节")
 
 
 if __name__ == "__main__":
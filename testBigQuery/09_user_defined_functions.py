@@ -1,10 +1,10 @@
-from google.cloud import bigquery
+from bq_client import get_bqstorage_client, get_client
 
 PROJECT_ID = "webeye-internal-test"
 DATASET_ID = f"{PROJECT_ID}.learning_bq"
 UDF_NAME = f"{DATASET_ID}.parse_user_agent"
 
-client = bigquery.Client(project=PROJECT_ID)
+client = get_client(PROJECT_ID)
 
 
 def create_persistent_udf():
@@ -54,7 +54,7 @@ def use_udf_in_query():
         FROM sample_data
     """
 
-    df = client.query(query).to_dataframe()
+    df = client.query(query).to_dataframe(bqstorage_client=get_bqstorage_client())
     print("查询结果:")
     print(df)
 
@@ -1,13 +1,15 @@
 from google.cloud import bigquery
 from google.cloud.exceptions import NotFound
 
+from bq_client import get_client
+
 PROJECT_ID = "webeye-internal-test"
 DATASET_ID = f"{PROJECT_ID}.learning_bq"
 # 这里的 app_logs 是我们在 Phase 2 脚本 06 中创建的
 BASE_TABLE_ID = f"{DATASET_ID}.app_logs"
 MV_ID = f"{DATASET_ID}.daily_log_summary"
 
-client = bigquery.Client(project=PROJECT_ID)
+client = get_client(PROJECT_ID)
 
 
 def create_materialized_view():
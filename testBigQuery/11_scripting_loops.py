@@ -1,7 +1,7 @@
-from google.cloud import bigquery
+from bq_client import get_client
 
 PROJECT_ID = "webeye-internal-test"
-client = bigquery.Client(project=PROJECT_ID)
+client = get_client(PROJECT_ID)
 
 
 def run_scripting_demo():
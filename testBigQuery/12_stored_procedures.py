@@ -1,4 +1,4 @@
-from google.cloud import bigquery
+from bq_client import get_client
 
 PROJECT_ID = "webeye-internal-test"
 DATASET_ID = f"{PROJECT_ID}.learning_bq"
@@ -6,7 +6,7 @@ PROCEDURE_ID = f"{DATASET_ID}.cleanup_old_logs"
 # 目标表（我们在 Phase 2 中创建的 app_logs）
 TARGET_TABLE = f"{DATASET_ID}.app_logs"
 
-client = bigquery.Client(project=PROJECT_ID)
+client = get_client(PROJECT_ID)
 
 
 def create_stored_procedure():
@@ -0,0 +1,133 @@
+"""结果 DataFrame 转换策略的峰值内存对比（frame_loader.STRATEGIES）。
+
+每种策略在单独的子进程里取一次 pageviews 查询的结果（Arrow），再转成 DataFrame，
+记录取回 Arrow 后的 RSS、转换后的峰值 RSS（VmHWM）、DataFrame 自身的内存占用和转换耗时。
+加 --fake 时不访问 BigQuery，合成同样形状的数据（title 高基数，wiki 低基数）。
+
+用法（在 testBigQuery/ 目录下）：
+    python bench/bench_frame_loader.py --query hourly --rows 2000000   # 需要 ADC 凭证
+    python bench/bench_frame_loader.py --fake --rows 2000000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(HERE)
+sys.path.insert(0, APP_DIR)
+
+MIB = 1024 * 1024
+
+QUERIES = {
+    # Playground 默认模板去掉 LIMIT 10：按标题聚合的一天浏览量
+    "daily": """
+        SELECT title, SUM(views) as views
+        FROM `bigquery-public-data.wikipedia.pageviews_2020`
+        WHERE date(datehour) = '2020-01-01'
+        GROUP BY title
+        LIMIT {rows}
+    """,
+    # 一个小时分区的原始行
+    "hourly": """
+        SELECT title, wiki, views
+        FROM `bigquery-public-data.wikipedia.pageviews_2020`
+        WHERE datehour = '2020-01-01 00:00:00'
+        LIMIT {rows}
+    """,
+}
+
+
+def rss_mib(field):
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def fake_pageviews(rows):
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    rng = np.random.default_rng(0)
+    ids = pa.array(rng.integers(0, rows // 2 + 1, rows)).cast(pa.string())
+    wikis = np.array(["en", "de", "fr", "ja", "zh", "es", "ru", "it", "en.m", "de.m"])
+    return pa.table(
+        {
+            "title": pc.binary_join_element_wise("Wikipedia_article_", ids, ""),
+            "wiki": pa.array(wikis[rng.integers(0, len(wikis), rows)]),
+            "views": pa.array(rng.zipf(1.5, rows).clip(1, 10**6)),
+        }
+    )
+
+
+def child(args):
+    import frame_loader
+
+    if args.fake:
+        table = fake_pageviews(args.rows)
+    else:
+        from bq_client import get_bqstorage_client, get_client
+
+        sql = QUERIES[args.query].format(rows=args.rows)
+        job = get_client().query(sql)
+        table = job.to_arrow(bqstorage_client=get_bqstorage_client())
+    arrow_rss = rss_mib("VmRSS")
+    start = time.perf_counter()
+    df = frame_loader.to_frame(table, args.child)
+    seconds = time.perf_counter() - start
+    json.dump(
+        {
+            "rows": table.num_rows,
+            "arrow_mib": table.nbytes / MIB,
+            "arrow_rss_mib": arrow_rss,
+            "peak_rss_mib": rss_mib("VmHWM"),
+            "frame_mib": frame_loader.memory_bytes(df) / MIB,
+            "seconds": seconds,
+        },
+        sys.stdout,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--query", choices=sorted(QUERIES), default="hourly")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--fake", action="store_true", help="合成数据，不访问 BigQuery")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args)
+        return
+
+    import frame_loader
+
+    source = "fake" if args.fake else args.query
+    print(f"source={source} rows={args.rows:,}")
+    print(
+        f"{'strategy':>9} {'rows':>10} {'arrow MiB':>10} {'frame MiB':>10}"
+        f" {'RSS after arrow':>16} {'peak RSS':>9} {'seconds':>8}"
+    )
+    for strategy in frame_loader.STRATEGIES:
+        cmd = [sys.executable, os.path.abspath(__file__), "--child", strategy]
+        cmd += ["--query", args.query, "--rows", str(args.rows)]
+        if args.fake:
+            cmd.append("--fake")
+        out = subprocess.run(cmd, cwd=APP_DIR, capture_output=True, text=True)
+        if out.returncode:
+            sys.exit(out.stderr)
+        r = json.loads(out.stdout)
+        print(
+            f"{strategy:>9} {r['rows']:>10,} {r['arrow_mib']:>10.1f}"
+            f" {r['frame_mib']:>10.1f} {r['arrow_rss_mib']:>16.1f}"
+            f" {r['peak_rss_mib']:>9.1f} {r['seconds']:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
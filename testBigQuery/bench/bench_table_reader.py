@@ -0,0 +1,112 @@
+"""table_reader 吞吐随 stream 数的变化。
+
+对同一张表分别用 1、2、4、8... 个 stream 建读会话并并发读取，输出实际分到的 stream 数、
+行数、字节数、耗时和吞吐（MB/s）。加 --query 时再对比一次“查询作业 + to_arrow”的老路径。
+
+用法（在 testBigQuery/ 目录下）：
+    # 真实表（需要 ADC 凭证）
+    python bench/bench_table_reader.py --table learning_bq.app_logs \\
+        --columns user_id,event_type --where 'event_type = "click"' --query
+    # 离线：Storage API 替身（bench/fake_storage.py），只有客户端的 IPC 反序列化开销
+    python bench/bench_table_reader.py --fake
+
+--fake 的输出是合成数据：没有网络和服务端，只能用来检查 table_reader 自身
+（线程池、反序列化、concat）的开销，不代表 Storage API 的吞吐；替身不支持 --where。
+"""
+
+import argparse
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import table_reader  # noqa: E402
+
+
+def timed(read):
+    start = time.perf_counter()
+    table = read()
+    return table, time.perf_counter() - start
+
+
+def report(label, streams, table, seconds):
+    mb = table.nbytes / 1024 / 1024
+    print(
+        f"{label:>14} {streams:>8} {table.num_rows:>12,} {mb:>10.1f}"
+        f" {seconds:>8.2f} {mb / seconds:>10.1f}"
+    )
+
+
+def query_baseline(args, bqstorage_client):
+    from bq_client import get_client
+
+    columns = ", ".join(f"`{c}`" for c in args.columns) if args.columns else "*"
+    sql = f"SELECT {columns} FROM `{args.table}`"
+    if args.where:
+        sql += f" WHERE {args.where}"
+    job = get_client().query(sql)
+    return job.to_arrow(bqstorage_client=bqstorage_client)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--table", default="learning_bq.app_logs")
+    parser.add_argument("--columns", type=lambda s: s.split(","), default=None)
+    parser.add_argument("--where", default=None, help="row_restriction 过滤条件")
+    parser.add_argument(
+        "--streams", type=lambda s: [int(n) for n in s.split(",")], default=[1, 2, 4, 8]
+    )
+    parser.add_argument("--query", action="store_true", help="对比查询作业路径")
+    parser.add_argument("--fake", action="store_true", help="使用 Storage API 替身")
+    parser.add_argument("--rows", type=int, default=2_000_000, help="替身表的行数")
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="替身每页额外 sleep 的秒数"
+    )
+    args = parser.parse_args()
+    if args.fake and args.where:
+        parser.error("--fake 的替身不执行 row_restriction，不能和 --where 一起使用")
+
+    if args.fake:
+        from fake_storage import FakeReadClient
+
+        bqstorage_client = FakeReadClient(rows=args.rows, latency=args.latency)
+        project = "bench-project"
+    else:
+        from bq_client import PROJECT_ID, get_bqstorage_client
+
+        bqstorage_client = get_bqstorage_client()
+        project = PROJECT_ID
+
+    if args.fake:
+        print(
+            f"synthetic: 本地替身（{args.rows:,} 行，每页 sleep {args.latency}s），"
+            "不是 Storage API 的实测吞吐"
+        )
+    print(f"table={args.table} columns={args.columns} where={args.where!r}")
+    print(
+        f"{'path':>14} {'streams':>8} {'rows':>12} {'MB':>10}"
+        f" {'seconds':>8} {'MB/s':>10}"
+    )
+    for requested in args.streams:
+        session = table_reader.create_session(
+            args.table,
+            args.columns,
+            args.where,
+            requested,
+            bqstorage_client,
+            project,
+        )
+        table, seconds = timed(
+            lambda: table_reader.read_session(session, bqstorage_client)
+        )
+        report(f"storage x{requested}", len(session.streams), table, seconds)
+    if args.query and not args.fake:
+        table, seconds = timed(lambda: query_baseline(args, bqstorage_client))
+        report("query job", 0, table, seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""JobManager 的离线检查：insert 时就已完成（DONE）的作业。
+
+命中 BigQuery 缓存或很快的查询在 jobs.insert 的响应里 state 就是 DONE，
+之后 poll() 不会再访问 BigQuery，所以扫描量、结束时间和错误必须在 submit() 时记下；
+否则页面显示“扫描: None Bytes”，用时一直往上涨，insert 时的失败也看不到。
+用一个不访问网络的客户端替身检查这几项；不满足时以非零状态退出。
+
+用法（在 testBigQuery/ 目录下）：
+    python bench/check_job_manager.py
+"""
+
+import datetime
+import os
+import sys
+import time
+import types
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from job_manager import JobManager  # noqa: E402
+
+
+class DoneOnInsertClient:
+    """query() 返回已完成的作业；记录所有 API 调用。"""
+
+    def __init__(self, error_result=None):
+        self.error_result = error_result
+        self.calls = []
+
+    def query(self, sql, job_config=None):
+        self.calls.append(("query", sql))
+        return types.SimpleNamespace(
+            job_id="job1",
+            location="US",
+            state="DONE",
+            total_bytes_processed=1234,
+            estimated_bytes_processed=None,
+            ended=datetime.datetime.now(datetime.timezone.utc),
+            error_result=self.error_result,
+        )
+
+    def get_job(self, job_id, location=None):
+        self.calls.append(("get_job", job_id))
+        raise AssertionError("DONE 的作业不应再 get_job")
+
+
+def check_done(failures):
+    client = DoneOnInsertClient()
+    jobs = JobManager(client, {})
+    entry = jobs.submit("playground", "SELECT 1")
+    if entry["bytes_processed"] != 1234:
+        failures.append(f"bytes_processed = {entry['bytes_processed']!r}")
+    if entry["ended_at"] is None:
+        failures.append("ended_at 未设置")
+    elapsed = jobs.elapsed("playground")
+    time.sleep(0.2)
+    if jobs.elapsed("playground") != elapsed:
+        failures.append("完成后 elapsed() 仍在增长")
+    jobs.poll("playground", force=True)
+    if client.calls != [("query", "SELECT 1")]:
+        failures.append(f"多余的 API 调用: {client.calls[1:]}")
+
+
+def check_error(failures):
+    client = DoneOnInsertClient(error_result={"message": "Syntax error"})
+    jobs = JobManager(client, {})
+    entry = jobs.submit("playground", "SELEC 1")
+    if entry["error"] != "Syntax error":
+        failures.append(f"insert 时的错误未记录: error = {entry['error']!r}")
+
+
+def main():
+    failures = []
+    check_done(failures)
+    check_error(failures)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print("OK")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
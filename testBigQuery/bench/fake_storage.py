@@ -0,0 +1,78 @@
+"""Storage Read API 客户端替身，用于离线运行基准。
+
+实现 table_reader 用到的 create_read_session / read_rows 两个方法：
+表按 stream 数均分，每个 stream 按页返回 RecordBatch。和真实客户端一样，
+每页是一段序列化的 Arrow IPC 消息：先拷贝出 bytes（对应 gRPC 收包、解析 protobuf），
+再用 pa.ipc.read_record_batch 反序列化。latency 可以在每页之前额外 sleep，
+模拟网络往返，默认 0。
+
+这只是客户端一侧的合成负载，没有网络、没有服务端，测出的数字不是 Storage API 的吞吐。
+不支持 row_restriction。
+"""
+
+import time
+import types
+
+import pyarrow as pa
+
+
+class FakeReadClient:
+    def __init__(self, rows=2_000_000, page_rows=50_000, latency=0.0):
+        self.rows = rows
+        self.page_rows = page_rows
+        self.latency = latency
+        self.calls = []
+        self._page = pa.record_batch(
+            {
+                "user_id": pa.array(range(page_rows), pa.int64()),
+                "event_type": pa.array(["click", "view"] * (page_rows // 2)),
+                "message": pa.array(["x" * 40] * page_rows),
+            }
+        )
+
+    def create_read_session(self, parent, read_session, max_stream_count):
+        self.calls.append(("create_read_session", max_stream_count))
+        if read_session.read_options.row_restriction:
+            raise ValueError("FakeReadClient 不支持 row_restriction")
+        columns = list(read_session.read_options.selected_fields) or None
+        page = self._page if columns is None else self._page.select(columns)
+        # 和真实服务一样，小表分不出那么多 stream
+        count = max(min(max_stream_count, self.rows // self.page_rows), 1)
+        bounds = [self.rows * i // count for i in range(count + 1)]
+        streams = [
+            types.SimpleNamespace(name=f"stream/{i}/{bounds[i]}/{bounds[i + 1]}")
+            for i in range(count)
+        ]
+        schema = page.schema.serialize().to_pybytes()
+        return types.SimpleNamespace(
+            streams=streams,
+            arrow_schema=types.SimpleNamespace(serialized_schema=schema),
+            page=page.serialize(),
+            page_rows=page.num_rows,
+        )
+
+    def read_rows(self, name):
+        _, _, start, end = name.split("/")
+        return _FakeStream(self, int(end) - int(start))
+
+
+class _FakeStream:
+    def __init__(self, client, rows):
+        self._client = client
+        self._rows = rows
+
+    def to_arrow(self, session):
+        schema = pa.ipc.read_schema(
+            pa.py_buffer(session.arrow_schema.serialized_schema)
+        )
+        batches = []
+        remaining = self._rows
+        while remaining > 0:
+            if self._client.latency:
+                time.sleep(self._client.latency)
+            payload = pa.py_buffer(session.page.to_pybytes())
+            batch = pa.ipc.read_record_batch(payload, schema)
+            batch = batch.slice(0, min(remaining, session.page_rows))
+            batches.append(batch)
+            remaining -= batch.num_rows
+        return pa.Table.from_batches(batches, schema)
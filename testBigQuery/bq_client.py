@@ -0,0 +1,141 @@
+"""testBigQuery 各脚本共用的 BigQuery 客户端：每个进程每个项目只创建一次。
+
+bigquery.Client 的构造要做 ADC 发现；第一次请求还要建立 TLS 连接。
+所有脚本都从这里取客户端，重复运行（包括 dashboard 的代码实验室 exec）时
+复用同一个客户端和它的 keep-alive 连接池，不再重复这些开销。
+
+环境变量：
+    BQ_PROJECT_ID       默认项目（webeye-internal-test）
+    BQ_HTTP_POOL_SIZE   HTTP 连接池大小，默认 32，应不小于并发查询 / 翻页的线程数
+
+用法：
+    from bq_client import get_client, get_bqstorage_client
+
+    client = get_client()
+    df = client.query(sql).to_dataframe(bqstorage_client=get_bqstorage_client())
+"""
+
+import contextlib
+import os
+import threading
+
+PROJECT_ID = os.environ.get("BQ_PROJECT_ID", "webeye-internal-test")
+HTTP_POOL_SIZE = int(os.environ.get("BQ_HTTP_POOL_SIZE", 32))
+
+_clients = {}
+_credentials = {}
+_bqstorage = {}
+_pid = None
+_lock = threading.Lock()
+_recording = threading.local()
+
+
+def default_credentials():
+    """ADC 凭证，使用与 bigquery.Client 默认相同的 scope。"""
+    import google.auth
+    from google.cloud import bigquery
+
+    credentials, _ = google.auth.default(scopes=bigquery.Client.SCOPE)
+    return credentials
+
+
+def create_client(project=PROJECT_ID, credentials=None):
+    """新建客户端：自己构造 AuthorizedSession，挂上调大的 keep-alive 连接池
+    （requests 默认每主机 10 个连接），再交给 bigquery.Client。"""
+    from google.auth.transport.requests import AuthorizedSession
+    from google.cloud import bigquery
+    from requests.adapters import HTTPAdapter
+
+    credentials = credentials or default_credentials()
+    session = AuthorizedSession(credentials)
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+    session.mount("https://", adapter)
+    return bigquery.Client(project=project, credentials=credentials, _http=session)
+
+
+def _reset_after_fork():
+    # 连接和 gRPC channel 不能跨 fork 复用，子进程各自重建
+    global _pid
+    pid = os.getpid()
+    if _pid != pid:
+        _clients.clear()
+        _credentials.clear()
+        _bqstorage.clear()
+        _pid = pid
+
+
+def get_client(project=PROJECT_ID):
+    """本进程共享的客户端；在 record_jobs() 中调用时返回记录作业的包装客户端。"""
+    with _lock:
+        _reset_after_fork()
+        client = _clients.get(project)
+        if client is None:
+            credentials = _credentials[project] = default_credentials()
+            client = _clients[project] = create_client(project, credentials)
+    jobs = getattr(_recording, "jobs", None)
+    return client if jobs is None else RecordingClient(client, jobs)
+
+
+class RecordingClient:
+    """把 query() 创建的作业追加到 jobs，其余属性原样转发给被包装的客户端。"""
+
+    def __init__(self, client, jobs):
+        self._client = client
+        self.jobs = jobs
+
+    def query(self, *args, **kwargs):
+        job = self._client.query(*args, **kwargs)
+        self.jobs.append(job)
+        return job
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+@contextlib.contextmanager
+def record_jobs():
+    """在本线程内记录经 get_client() 创建的查询作业，产出作业列表。
+
+    Dashboard 代码实验室 exec 脚本时用它找出这次运行自己创建的作业；
+    只对当前线程生效，同一进程里其它会话、其它线程的查询不会被记进来。
+    """
+    jobs = []
+    previous = getattr(_recording, "jobs", None)
+    _recording.jobs = jobs
+    try:
+        yield jobs
+    finally:
+        _recording.jobs = previous
+
+
+def set_client(client, credentials=None):
+    """注入一个已有的客户端（如 dashboard 用 st.cache_resource 缓存的那个），
+    之后同一进程里 get_client(client.project) 都返回它。
+
+    credentials 是构造 client 时用的凭证，Storage Read API 客户端也用它；
+    不传时 get_bqstorage_client() 自己做一次 ADC 发现。"""
+    with _lock:
+        _reset_after_fork()
+        _clients[client.project] = client
+        _credentials[client.project] = credentials
+
+
+def get_bqstorage_client(project=PROJECT_ID):
+    """本进程共享的 Storage Read API 客户端。
+
+    to_dataframe() / to_arrow() 不传 bqstorage_client 时，每次调用都会新建一个
+    gRPC channel（一次 TLS 握手）并在结束后关闭；传入这里的共享实例即可复用。
+    未安装 google-cloud-bigquery-storage 时返回 None，调用方退回 REST 下载。
+    """
+    get_client(project)
+    with _lock:
+        bqstorage = _bqstorage.get(project)
+        if bqstorage is None:
+            try:
+                from google.cloud import bigquery_storage
+            except ImportError:
+                return None
+            bqstorage = _bqstorage[project] = bigquery_storage.BigQueryReadClient(
+                credentials=_credentials.get(project)
+            )
+        return bqstorage
@@ -0,0 +1,109 @@
+"""Playground 自动图表的降采样：发给浏览器的点数不超过 MAX_POINTS。
+
+st.bar_chart / st.line_chart 会把整列数据序列化给前端（Vega-Lite）渲染，
+几万行以上时页面明显卡顿。按横轴类型分两种处理：
+
+- 类别轴（字符串、category 等）：按类别求和，保留最大的 MAX_POINTS - 1 个，
+  其余合并为一个“其他”
+- 有序轴（数值、日期 / 时间）：按横轴排序后用 LTTB（Largest-Triangle-Three-Buckets）
+  选点，保留折线的形状和极值；每个桶内的三角形面积用 numpy 一次算完
+
+环境变量：
+    BQ_CHART_MAX_POINTS   图表最多发送的点数，默认 1000
+"""
+
+import collections
+import datetime
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+MAX_POINTS = int(os.environ.get("BQ_CHART_MAX_POINTS", 1000))
+OTHER = "其他"
+
+# data 是以横轴为索引的 Series；kind 为 "raw" / "top_n" / "lttb"
+Chart = collections.namedtuple("Chart", "data kind points_in points_out")
+
+
+def lttb(x, y, n_out):
+    """LTTB 降采样，返回选中点的下标（升序）；x 须已升序。"""
+    n = len(x)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1][:n_out], dtype=np.intp)
+    x = np.asarray(x, dtype="float64") - x[0]
+    y = np.asarray(y, dtype="float64")
+    # 首尾两点固定，中间 n - 2 个点均分成 n_out - 2 个桶（每个桶至少一个点）
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    counts = np.diff(edges)
+    # 用前缀和一次算出每个桶的平均点；最后一个桶的“下一个桶”就是终点
+    cx = np.concatenate(([0.0], np.cumsum(x)))
+    cy = np.concatenate(([0.0], np.cumsum(y)))
+    avg_x = (cx[edges[1:]] - cx[edges[:-1]]) / counts
+    avg_y = (cy[edges[1:]] - cy[edges[:-1]]) / counts
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    selected = np.empty(n_out, dtype=np.intp)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # 以上一个选中点 a 和下一个桶的平均点为底，选桶内三角形面积最大的点
+        area = np.abs(
+            (x[a] - next_x[i]) * (y[lo:hi] - y[a])
+            - (x[a] - x[lo:hi]) * (next_y[i] - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def _ordered_axis(series):
+    """数值 / 日期时间横轴返回可排序的 float64 数组（时间为纳秒），类别轴返回 None。"""
+    if pd.api.types.is_bool_dtype(series):
+        return None
+    if pd.api.types.is_numeric_dtype(series):
+        return series.to_numpy(dtype="float64", na_value=np.nan)
+    dtype = series.dtype
+    is_date = isinstance(dtype, pd.ArrowDtype) and pa.types.is_date(dtype.pyarrow_dtype)
+    if pd.api.types.is_object_dtype(dtype):
+        first = series.dropna().head(1)
+        is_date = len(first) > 0 and isinstance(first.iloc[0], datetime.date)
+    if not (is_date or pd.api.types.is_datetime64_any_dtype(series)):
+        return None
+    times = pd.to_datetime(series, utc=True).dt.tz_localize(None)
+    values = times.to_numpy(dtype="datetime64[ns]").astype("int64").astype("float64")
+    values[times.isna().to_numpy()] = np.nan
+    return values
+
+
+def top_n(df, x, y, max_points=MAX_POINTS):
+    """按 x 分组对 y 求和，保留最大的 max_points - 1 组，其余合并为“其他”。"""
+    sums = df.groupby(df[x].astype(str), sort=False)[y].sum()
+    if len(sums) <= max_points:
+        return sums
+    top = sums.nlargest(max_points - 1)
+    rest = sums.drop(top.index).sum()
+    return pd.concat([top, pd.Series({OTHER: rest})]).rename(y)
+
+
+def prepare(df, x, y, max_points=MAX_POINTS):
+    """为 x / y 两列生成图表数据；行数不超过 max_points 时原样返回。"""
+    points = len(df)
+    if points <= max_points:
+        return Chart(df.set_index(x)[y], "raw", points, points)
+    axis = _ordered_axis(df[x])
+    if axis is None:
+        data = top_n(df, x, y, max_points)
+        return Chart(data, "top_n", points, len(data))
+    values = df[y].to_numpy(dtype="float64", na_value=np.nan)
+    keep = ~(np.isnan(axis) | np.isnan(values))
+    order = np.argsort(axis[keep], kind="stable")
+    rows = np.flatnonzero(keep)[order]
+    picked = rows[lttb(axis[rows], values[rows], max_points)]
+    data = df.iloc[picked].set_index(x)[y]
+    return Chart(data, "lttb", points, len(data))
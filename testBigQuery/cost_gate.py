@@ -0,0 +1,105 @@
+"""SQL Playground 的成本闸门：先 Dry Run 估算扫描量，再带 maximum_bytes_billed 执行。
+
+- Dry Run 不计费，但每次仍是一次 API 往返；结果按 SQL 哈希缓存（见 DryRunCache），
+  Streamlit rerun 时重新估算没改过的 SQL 不再访问 BigQuery
+- 估算超过 CONFIRM_BYTES 时需要用户确认，超过 BLOCK_BYTES 时直接拒绝
+- 真正执行时 maximum_bytes_billed = 估算值 × HEADROOM，且每个引用表至少
+  预留 10 MiB（BigQuery 按表的最低计费量）；超出时 BigQuery 直接让作业失败而不是计费
+
+环境变量：
+    BQ_PLAYGROUND_CONFIRM_BYTES   需要确认的阈值，默认 10 GiB
+    BQ_PLAYGROUND_BLOCK_BYTES     直接拒绝的阈值，默认 1 TiB
+    BQ_BILLING_HEADROOM           maximum_bytes_billed 相对估算值的余量倍数，默认 1.2
+    BQ_DRY_RUN_TTL                Dry Run 结果缓存时间（秒），默认 600
+"""
+
+import collections
+import os
+import threading
+import time
+
+from result_cache import cache_key
+
+GIB = 1024**3
+MIN_BILLED_PER_TABLE = 10 * 1024 * 1024
+CONFIRM_BYTES = int(os.environ.get("BQ_PLAYGROUND_CONFIRM_BYTES", 10 * GIB))
+BLOCK_BYTES = int(os.environ.get("BQ_PLAYGROUND_BLOCK_BYTES", 1024 * GIB))
+HEADROOM = float(os.environ.get("BQ_BILLING_HEADROOM", 1.2))
+DRY_RUN_TTL = float(os.environ.get("BQ_DRY_RUN_TTL", 600))
+
+Estimate = collections.namedtuple("Estimate", "bytes_processed tables statement_type")
+
+
+class DryRunCache:
+    """Dry Run 结果的进程内 LRU 缓存，键是规范化 SQL 的哈希（cache_key）。"""
+
+    def __init__(self, ttl=DRY_RUN_TTL, max_entries=256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, estimate = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return estimate
+
+    def put(self, key, estimate):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, estimate)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+def estimate(client, sql, job_config=None, cache=None):
+    """Dry Run 估算扫描字节数；命中缓存时不访问 BigQuery。语法错误等直接抛出。"""
+    from google.cloud import bigquery
+
+    params = getattr(job_config, "query_parameters", None)
+    key = cache_key(sql, params, client.project)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+    config = bigquery.QueryJobConfig(
+        dry_run=True, use_query_cache=False, query_parameters=params or []
+    )
+    job = client.query(sql, job_config=config)
+    result = Estimate(
+        job.total_bytes_processed or 0,
+        len(job.referenced_tables or ()),
+        job.statement_type,
+    )
+    if cache is not None:
+        cache.put(key, result)
+    return result
+
+
+def billing_limit(estimate, headroom=HEADROOM):
+    """真正执行时的 maximum_bytes_billed。"""
+    floor = MIN_BILLED_PER_TABLE * max(estimate.tables, 1)
+    return max(int(estimate.bytes_processed * headroom), floor)
+
+
+def verdict(estimate, confirm_bytes=CONFIRM_BYTES, block_bytes=BLOCK_BYTES):
+    """返回 "ok" / "confirm" / "block"。"""
+    if estimate.bytes_processed > block_bytes:
+        return "block"
+    if estimate.bytes_processed > confirm_bytes:
+        return "confirm"
+    return "ok"
+
+
+def format_bytes(n):
+    for unit in ("B", "KiB", "MiB", "GiB", "TiB"):
+        if n < 1024 or unit == "TiB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.2f} {unit}"
+        n /= 1024
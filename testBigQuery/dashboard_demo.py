@@ -3,10 +3,21 @@ import os
 from io import StringIO
 
 import altair as alt
+import pyarrow as pa
 import streamlit as st
 from google.cloud import bigquery
 from streamlit_ace import st_ace  # 导入 Ace 编辑器
 
+import bq_client
+import chart_sampler
+import cost_gate
+import frame_loader
+import job_manager
+import paged_results
+import result_cache
+import result_export
+import table_preview
+
 # --- 1. 页面基础配置 ---
 st.set_page_config(
     page_title="BigQuery 实战平台",
@@ -17,12 +28,354 @@ st.set_page_config(
 
 
 # 初始化 Client (缓存以加速)
+# 用的是 bq_client 的进程级客户端，代码实验室 exec 的脚本调用 get_client()
+# 拿到的也是这一个，复用它的连接池，不再每次运行都重新创建客户端、重新握手
 @st.cache_resource
 def get_client():
-    return bigquery.Client(project="webeye-internal-test")
+    return bq_client.get_client()
 
 
 client = get_client()
+bqstorage_client = bq_client.get_bqstorage_client()
+
+
+# 查询结果的本地磁盘缓存（Arrow IPC，见 result_cache.py），所有会话共用
+@st.cache_resource
+def get_result_cache():
+    return result_cache.ResultCache()
+
+
+results = get_result_cache()
+
+
+def use_result_cache():
+    return st.session_state.get("use_result_cache", True)
+
+
+# Dry Run 估算结果按 SQL 哈希缓存（见 cost_gate.py），rerun 时重复估算不访问 BigQuery
+@st.cache_resource
+def get_dry_run_cache():
+    return cost_gate.DryRunCache()
+
+
+dry_runs = get_dry_run_cache()
+
+# 后台查询作业（见 job_manager.py）：会话里只存作业 ID，脚本线程不等待查询完成
+jobs = job_manager.JobManager(client, st.session_state.setdefault("bq_jobs", {}))
+# 已取回的结果 {名字: (DataFrame, 作业状态 dict 或 None)}，rerun 时直接复用
+finished = st.session_state.setdefault("job_results", {})
+# 分页浏览的结果 {名字: (PagedResult, 作业状态 dict 或 None)}，只在内存里保留几页
+paged = st.session_state.setdefault("paged_results", {})
+# 命中本地结果缓存的查询 {名字: (sql, job_config)}，导出时重新内存映射缓存文件
+cache_hits = st.session_state.setdefault("cache_hits", {})
+
+
+def to_frame(table):
+    """按侧边栏选择的策略把结果转成 DataFrame（见 frame_loader.py）。
+
+    这里的结果只用于展示，整数列可以按取值范围降位。
+    """
+    strategy = st.session_state.get("dtype_strategy", "compact")
+    return frame_loader.to_frame(table, strategy, downcast_ints=True)
+
+
+def frame_size(df):
+    memory = cost_gate.format_bytes(frame_loader.memory_bytes(df))
+    return f"{len(df):,} 行 · 内存 {memory}"
+
+
+def answer_from_cache(name, sql, job_config=None):
+    """命中本地结果缓存时直接作为 name 的结果，返回 True。"""
+    if not use_result_cache():
+        return False
+    table = result_cache.lookup(client, sql, job_config, cache=results)
+    if table is None:
+        return False
+    jobs.forget(name)
+    paged.pop(name, None)
+    cache_hits[name] = (sql, job_config)
+    finished[name] = (to_frame(table), None)
+    return True
+
+
+def answer_pages_from_cache(name, sql, job_config=None):
+    """分页模式下的 answer_from_cache：直接在内存映射的缓存表上翻页，不转成 DataFrame。"""
+    if not use_result_cache():
+        return False
+    table = result_cache.lookup(client, sql, job_config, cache=results)
+    if table is None:
+        return False
+    jobs.forget(name)
+    finished.pop(name, None)
+    cache_hits[name] = (sql, job_config)
+    paged[name] = (paged_results.PagedResult.from_arrow(table), None)
+    return True
+
+
+def submit_query(name, sql, job_config=None):
+    """提交后台作业（替换同名的旧结果），结果由 job_result(name) 取回。"""
+    finished.pop(name, None)
+    paged.pop(name, None)
+    cache_hits.pop(name, None)
+    jobs.submit(name, sql, job_config)
+
+
+def start_query(name, sql, job_config=None):
+    if not answer_from_cache(name, sql, job_config):
+        submit_query(name, sql, job_config)
+
+
+def has_query(name):
+    return name in finished or name in paged or jobs.get(name) is not None
+
+
+@st.fragment(run_every=1.0)
+def job_status(name):
+    """作业运行期间每秒刷新本片段；实际访问 BigQuery 的频率由 JobManager 的退避间隔决定。"""
+    entry = jobs.poll(name)
+    if entry is None or entry["state"] == "DONE":
+        st.rerun()
+    processed = entry["bytes_processed"]
+    text = (
+        f"⏳ {entry['state']} · 已用 {jobs.elapsed(name):.1f}s"
+        f" · 已处理 {cost_gate.format_bytes(processed) if processed else '-'}"
+    )
+    if entry["cancelled"]:
+        text += " · 正在取消..."
+    col_status, col_cancel = st.columns([5, 1])
+    col_status.info(text)
+    col_cancel.button(
+        "取消 ⏹️",
+        key=f"cancel_{name}",
+        disabled=entry["cancelled"],
+        use_container_width=True,
+        on_click=jobs.cancel,
+        args=(name,),
+    )
+
+
+def finished_job(name, failure_hint=None):
+    """作业成功完成时返回状态 dict；仍在运行或失败时显示状态 / 错误并返回 None。"""
+    entry = jobs.get(name)
+    if entry is None:
+        return None
+    if entry["state"] != "DONE":
+        job_status(name)
+        return None
+    if entry["error"]:
+        if entry["cancelled"]:
+            st.warning("⏹️ 查询已取消")
+        else:
+            if failure_hint:
+                st.warning(failure_hint)
+            st.error(f"❌ 出错: {entry['error']}")
+        return None
+    return entry
+
+
+def job_result(name, failure_hint=None):
+    """返回 (DataFrame, 作业状态 dict 或 None)；作业未完成或失败时显示状态并返回 None。"""
+    if name in finished:
+        return finished[name]
+    entry = finished_job(name, failure_hint)
+    if entry is None:
+        return None
+    progress = st.progress(0.0, text="⬇️ 正在下载结果...")
+
+    def on_progress(loaded, total):
+        fraction = min(loaded / total, 1.0) if total else 1.0
+        progress.progress(fraction, text=f"⬇️ 已下载 {loaded} / {total} 行")
+
+    try:
+        table, job = jobs.fetch_arrow(name, bqstorage_client, on_progress)
+    except Exception as e:
+        progress.empty()
+        st.error(f"❌ 下载结果出错: {e}")
+        return None
+    progress.empty()
+    # QueryJob 自带 query_parameters，可以直接当作 job_config 计算缓存 key
+    result_cache.save(client, entry["sql"], table, job, job_config=job, cache=results)
+    finished[name] = (to_frame(table), entry)
+    return finished[name]
+
+
+# 分页模式下只有不超过这个行数（分页器默认在内存里保留的行数）的结果会写入本地结果缓存
+PAGED_CACHE_ROWS = int(os.environ.get("BQ_PAGED_CACHE_ROWS", 500 * 8))
+
+
+def paged_result(name, failure_hint=None):
+    """job_result 的分页版本：返回 (PagedResult, 作业状态 dict 或 None)，不下载整个结果。
+
+    没有目的表的作业（DDL、多语句脚本）退回 job_result 整体读取。
+    """
+    if name in paged:
+        return paged[name]
+    if name in finished:
+        df, entry = finished[name]
+        paged[name] = (paged_results.PagedResult.from_arrow(pa.table(df)), entry)
+        return paged[name]
+    entry = finished_job(name, failure_hint)
+    if entry is None:
+        return None
+    pages = paged_results.PagedResult.from_job(client, jobs.job(name))
+    if pages is not None and pages.total_rows <= PAGED_CACHE_ROWS:
+        # 小结果整体下载一次并写入本地结果缓存；更大的结果只按页读取，不写缓存，
+        # 重复运行会重新执行查询（分页模式就是为了不下载整个结果）
+        table, job = jobs.fetch_arrow(name, bqstorage_client)
+        result_cache.save(
+            client, entry["sql"], table, job, job_config=job, cache=results
+        )
+        pages = paged_results.PagedResult.from_arrow(table)
+    elif pages is None:
+        result = job_result(name, failure_hint)
+        if result is None:
+            return None
+        df, entry = result
+        pages = paged_results.PagedResult.from_arrow(pa.table(df))
+    paged[name] = (pages, entry)
+    return paged[name]
+
+
+def export_panel(key, file_name, job=None, table=None, load_job=None):
+    """把 job（已完成的查询作业）或 table（缓存的 Arrow 表）逐批写入本地文件，显示进度。
+
+    load_job 是返回作业的函数，点了导出才调用：rerun 只画面板时不访问 BigQuery。
+    """
+    with st.expander("💾 导出结果到本地文件"):
+        col_fmt, col_path = st.columns([1, 4])
+        fmt = col_fmt.selectbox(
+            "格式", list(result_export.FORMATS), key=f"{key}_export_fmt"
+        )
+        path = col_path.text_input(
+            "保存路径",
+            value=result_export.default_path(file_name, fmt),
+            key=f"{key}_export_path_{file_name}_{fmt}",
+        )
+        if not st.button("导出 💾", key=f"{key}_export"):
+            return
+        progress = st.progress(0.0, text="💾 正在导出...")
+
+        def on_progress(rows, total, written):
+            fraction = min(rows / total, 1.0) if total else 1.0
+            progress.progress(
+                fraction,
+                text=f"💾 已写入 {rows:,} / {total or 0:,} 行 · "
+                f"{cost_gate.format_bytes(written)}",
+            )
+
+        try:
+            if load_job is not None:
+                job = load_job()
+            if job is not None:
+                rows, size = result_export.export_job(
+                    job, path, fmt, bqstorage_client, on_progress
+                )
+            else:
+                rows, size = result_export.export_table(table, path, fmt, on_progress)
+        except Exception as e:
+            progress.empty()
+            st.error(f"❌ 导出出错: {e}")
+            return
+        progress.empty()
+        st.success(
+            f"✅ 已导出 {rows:,} 行（{cost_gate.format_bytes(size)}）到 `{path}`"
+        )
+
+
+def export_result(name):
+    """name 的结果导出面板：作业结果从 BigQuery 流式下载，缓存命中则读本地缓存文件。"""
+    entry = jobs.get(name)
+    if entry is not None:
+        export_panel(name, f"{name}_{entry['job_id']}", load_job=lambda: jobs.job(name))
+        return
+    sql, job_config = cache_hits.get(name, ("", None))
+    table = result_cache.lookup(client, sql, job_config, cache=results)
+    if table is None:
+        st.caption("缓存条目已过期，重新运行查询后可导出。")
+        return
+    export_panel(name, f"{name}_cache", table=table)
+
+
+PAGE_SIZES = [100, 500, 1000, 5000]
+
+
+def show_pages(pages, key):
+    """分页浏览器：只读取当前页，翻页时按需请求。返回当前页的 DataFrame。"""
+    col_size, col_page, col_info = st.columns([1, 1, 3])
+    page_size = col_size.selectbox(
+        "每页行数", PAGE_SIZES, index=PAGE_SIZES.index(500), key=f"{key}_page_size"
+    )
+    if page_size != pages.page_size:
+        pages.page_size = page_size
+    # 换了结果或每页行数后，原页码可能超出范围
+    page_key = f"{key}_page"
+    if st.session_state.get(page_key, 1) > pages.page_count:
+        st.session_state[page_key] = pages.page_count
+    page_no = col_page.number_input(
+        "页码", min_value=1, max_value=pages.page_count, step=1, key=page_key
+    )
+    df = to_frame(pages.page(page_no - 1))
+    page_bytes = cost_gate.format_bytes(frame_loader.memory_bytes(df))
+    col_info.caption(
+        f"共 {pages.total_rows:,} 行 · 第 {page_no} / {pages.page_count} 页"
+        f"（DataFrame {page_bytes}） · "
+        f"内存中保留 {len(pages.cached_pages)} 页（上限 {pages.max_pages}）"
+    )
+    st.dataframe(df)
+    return df
+
+
+CHART_METHODS = {"top_n": "Top N + 其他", "lttb": "LTTB"}
+
+
+def auto_chart(df, note=""):
+    """第一列作横轴、第一个数值列作纵轴；点数超过上限时先降采样（见 chart_sampler.py）。"""
+    x = df.columns[0]
+    num_cols = [c for c in df.select_dtypes(include=["number"]).columns if c != x]
+    if not num_cols:
+        return
+    chart = chart_sampler.prepare(df, x, num_cols[0])
+    caption = "自动生成的图表预览" + note
+    if chart.kind != "raw":
+        reduced = 1 - chart.points_out / chart.points_in
+        caption += (
+            f" · {chart.points_in:,} → {chart.points_out:,} 点"
+            f"（{CHART_METHODS[chart.kind]}，减少 {reduced:.1%}）"
+        )
+    st.caption(caption)
+    if chart.kind == "lttb":
+        st.line_chart(chart.data)
+    else:
+        st.bar_chart(chart.data)
+
+
+# 表预览用到的元数据列表（见 table_preview.py），5 分钟内 rerun 不重复请求
+@st.cache_data(ttl=300, show_spinner=False)
+def preview_datasets():
+    return table_preview.list_datasets(client)
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def preview_tables(dataset):
+    return table_preview.list_tables(client, dataset)
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def preview_columns(table_id):
+    return [field.name for field in client.get_table(table_id).schema]
+
+
+def run_preview(table, columns, limit):
+    """list_rows 读取前 limit 行作为 Playground 的结果（替换之前的查询结果）。"""
+    data = table_preview.preview(client, table, columns, limit)
+    jobs.forget("playground")
+    finished.pop("playground", None)
+    paged.pop("playground", None)
+    cache_hits.pop("playground", None)
+    if not isinstance(table, str):
+        table = table.full_table_id.replace(":", ".")
+    st.session_state.table_preview = (table, to_frame(data))
+
 
 # --- 2. 实战目录定义与分组 ---
 PHASES = {
@@ -97,6 +450,33 @@ for phase_name, items in PHASES.items():
                 st.rerun()
 
 st.sidebar.divider()
+st.sidebar.toggle(
+    "⚡ 使用本地结果缓存",
+    value=True,
+    key="use_result_cache",
+    help="关闭后每次都重新执行查询（结果仍会写回缓存）；"
+    "含 CURRENT_*()、RAND() 等非确定函数或读取 learning_bq 的查询始终重新执行；"
+    f"Playground 分页模式下超过 {PAGED_CACHE_ROWS:,} 行的结果不缓存",
+)
+_cache_entries, _cache_bytes = results.stats()
+st.sidebar.caption(
+    f"结果缓存: {_cache_entries} 条, {_cache_bytes / 1024 / 1024:.1f} MB"
+    f" / {results.max_bytes / 1024 / 1024:.0f} MB"
+)
+st.sidebar.selectbox(
+    "🧮 结果 DataFrame 类型",
+    frame_loader.STRATEGIES,
+    key="dtype_strategy",
+    format_func={
+        "compact": "紧凑（category / Arrow 字符串 / 整数降位）",
+        "arrow": "全部 Arrow 类型",
+        "default": "pandas 默认",
+    }.get,
+    help="只影响之后取回的结果；结果的内存占用显示在行数旁边",
+)
+if st.sidebar.button("🧹 清空结果缓存", use_container_width=True):
+    results.clear()
+    st.rerun()
 st.sidebar.info("💡 建议按照 01-13 的顺序进行实战，以获得最佳学习效果。")
 
 selected_tutorial = st.session_state.selection
@@ -107,6 +487,21 @@ selected_tutorial = st.session_state.selection
 if selected_tutorial == "🛠️ SQL Playground (游乐场)":
     st.header("🛠️ SQL 在线游乐场")
     st.markdown("直接编写 SQL 并运行，支持自动图表生成。")
+    confirm_gib = st.number_input(
+        "💰 预计扫描超过多少 GiB 时需要确认",
+        min_value=0.0,
+        value=cost_gate.CONFIRM_BYTES / cost_gate.GIB,
+        step=1.0,
+        help="每次运行前先 Dry Run 估算扫描量；"
+        f"超过 {cost_gate.format_bytes(cost_gate.BLOCK_BYTES)} 的查询直接拒绝",
+    )
+    paged_mode = st.toggle(
+        "📄 分页浏览结果",
+        value=True,
+        key="paged_mode",
+        help="按页从查询的目的表读取（list_rows），不把整个结果载入内存；"
+        f"超过 {PAGED_CACHE_ROWS:,} 行的结果不写入本地结果缓存，重复运行会重新查询",
+    )
 
     # 快捷模板逻辑
     if "sql_input" not in st.session_state:
@@ -170,31 +565,166 @@ LIMIT 10"""
         )
         st.session_state.sql_input = user_sql
 
+    with st.expander("👀 免费预览表（list_rows，不跑查询、不计费）"):
+        try:
+            datasets = preview_datasets()
+            col_ds, col_tbl, col_rows = st.columns([2, 2, 1])
+            dataset = col_ds.selectbox("数据集", datasets, key="preview_dataset")
+            tables = preview_tables(dataset) if dataset else []
+            table_name = col_tbl.selectbox("表", tables, key="preview_table")
+            limit = col_rows.number_input(
+                "行数",
+                min_value=1,
+                max_value=table_preview.MAX_PREVIEW_ROWS,
+                value=20,
+                key="preview_rows",
+            )
+            if table_name:
+                table_id = f"{dataset}.{table_name}"
+                columns = st.multiselect(
+                    "列（留空为所有列）",
+                    preview_columns(table_id),
+                    key=f"preview_columns_{table_id}",
+                )
+                if st.button("预览 👀", key="preview_table_pg"):
+                    run_preview(table_id, columns, limit)
+        except Exception as e:
+            st.error(f"❌ 预览出错: {e}")
+
     # 3. 输出结果
-    if run_playground:
-        if not user_sql.strip():
+    # 单表的 SELECT * ... LIMIT n 按查询执行会按整表扫描量计费，先提示改用免费预览
+    as_query = False
+    if st.session_state.get("preview_offer") not in (None, user_sql):
+        del st.session_state.preview_offer
+    if not run_playground and "preview_offer" in st.session_state:
+        offer_box = st.empty()
+        with offer_box.container(border=True):
+            st.info(
+                "💡 这是对单表的 SELECT ... LIMIT 查询：LIMIT 不减少扫描量，"
+                "按查询执行仍按整表计费；改用表预览 (list_rows) 不产生查询作业。"
+            )
+            col_preview, col_query = st.columns(2)
+            as_preview = col_preview.button(
+                "免费预览 👀", key="preview_sql_pg", type="primary"
+            )
+            as_query = col_query.button("仍然运行查询 ▶️", key="query_sql_pg")
+        if as_preview or as_query:
+            offer_box.empty()
+            del st.session_state.preview_offer
+        if as_preview:
+            spec = table_preview.parse(user_sql)
+            try:
+                table = table_preview.check(client, spec)
+                run_preview(table, spec.columns, spec.limit)
+            except Exception as e:
+                st.error(f"❌ 预览出错: {e}")
+
+    # 超过确认阈值的查询先挂起，用户在下一次 rerun 中点“仍然运行”后才真正执行
+    confirmed = False
+    if st.session_state.get("pending_sql") not in (None, user_sql):
+        # SQL 改过了，之前的确认请求作废
+        del st.session_state.pending_sql
+    if not run_playground and "pending_sql" in st.session_state:
+        pending_box = st.empty()
+        with pending_box.container(border=True):
+            estimate = cost_gate.estimate(client, user_sql, cache=dry_runs)
+            st.warning(
+                f"⚠️ 预计扫描 {cost_gate.format_bytes(estimate.bytes_processed)}，"
+                f"超过确认阈值 {confirm_gib:g} GiB。"
+            )
+            confirmed = st.button("仍然运行 ▶️", key="confirm_sql_pg")
+        if confirmed:
+            pending_box.empty()
+
+    if run_playground or confirmed or as_query:
+        spec = table_preview.parse(user_sql) if run_playground else None
+        if spec is not None:
+            try:
+                table_preview.check(client, spec)
+            except Exception:
+                # 视图、表不存在等情况无法预览，按普通查询执行（错误由查询本身报告）
+                spec = None
+        if spec is not None:
+            st.session_state.preview_offer = user_sql
+            st.rerun()
+        elif not user_sql.strip():
             st.warning("SQL 不能为空")
         else:
+            st.session_state.pop("table_preview", None)
             output_container = st.container(border=True)
             with output_container:
                 status = st.empty()
-                status.info("⚡ 正在执行查询...")
                 try:
-                    query_job = client.query(user_sql)
-                    df = query_job.to_dataframe()
+                    if paged_mode:
+                        hit = answer_pages_from_cache("playground", user_sql)
+                    else:
+                        hit = answer_from_cache("playground", user_sql)
+                    if not hit:
+                        status.info("💰 正在估算扫描量 (Dry Run)...")
+                        estimate = cost_gate.estimate(client, user_sql, cache=dry_runs)
+                        verdict = cost_gate.verdict(
+                            estimate, confirm_bytes=confirm_gib * cost_gate.GIB
+                        )
+                        scan = cost_gate.format_bytes(estimate.bytes_processed)
+                        if verdict == "block":
+                            limit = cost_gate.format_bytes(cost_gate.BLOCK_BYTES)
+                            status.error(
+                                f"⛔ 预计扫描 {scan}，超过上限 {limit}，已拒绝执行。"
+                                "请加上分区过滤条件或只选择需要的列。"
+                            )
+                        elif verdict == "confirm" and not confirmed:
+                            st.session_state.pending_sql = user_sql
+                            st.rerun()
+                        else:
+                            st.session_state.pop("pending_sql", None)
+                            limit = cost_gate.billing_limit(estimate)
+                            job_config = bigquery.QueryJobConfig(
+                                maximum_bytes_billed=limit
+                            )
+                            submit_query("playground", user_sql, job_config)
+                            status.info(
+                                f"💰 预计扫描 {scan}，maximum_bytes_billed = {limit}"
+                            )
+                except Exception as e:
                     status.empty()
+                    st.error(f"❌ 出错: {e}")
+
+    if "table_preview" in st.session_state:
+        with st.container(border=True):
+            table_id, df = st.session_state.table_preview
+            st.success(
+                f"✅ 表预览 `{table_id}`（{frame_size(df)}）：list_rows 读取，"
+                "未产生查询作业，不计费"
+            )
+            st.dataframe(df)
+
+    # 4. 后台作业状态与结果（跨 rerun 保留，直到下一次运行）
+    if has_query("playground"):
+        with st.container(border=True):
+            if paged_mode:
+                result = paged_result("playground")
+            else:
+                result = job_result("playground")
+            if result is not None:
+                data, entry = result
+                # 分页模式下每页的内存占用显示在分页栏里
+                size = "" if paged_mode else f" · {frame_size(data)}"
+                if entry is None:
+                    st.success("✅ 命中本地结果缓存，未访问 BigQuery" + size)
+                else:
                     st.success(
-                        f"✅ 查询成功! 扫描: {query_job.total_bytes_processed} Bytes"
+                        f"✅ 查询成功! 用时 {jobs.elapsed('playground'):.1f}s，"
+                        f"扫描: {entry['bytes_processed']} Bytes" + size
                     )
+                if paged_mode:
+                    df = show_pages(data, "playground")
+                else:
+                    df = data
                     st.dataframe(df)
 
-                    num_cols = df.select_dtypes(include=["number"]).columns
-                    if len(num_cols) > 0 and len(df.columns) >= 2:
-                        st.caption("自动生成的图表预览")
-                        st.bar_chart(df.set_index(df.columns[0])[num_cols[0]])
-                except Exception as e:
-                    status.empty()
-                    st.error(f"❌ 出错: {e}")
+                auto_chart(df, "（当前页）" if paged_mode else "")
+
+                export_result("playground")
 
 # === 模式 B: 实战章节学习 ===
 else:
@@ -206,6 +736,9 @@ else:
         ["📝 代码实验室 (Code Lab)", "📊 可视化深度演示 (Deep Dive)"]
     )
 
+    # 代码实验室每个脚本最近一次运行创建的查询作业 {文件名: {job_id: QueryJob}}
+    codelab_jobs = st.session_state.setdefault("codelab_jobs", {})
+
     # --- Tab 1: 代码编辑 与 运行 (一体化 IDE 风格) ---
     with tab_code:
         # 0. 读取源码内容
@@ -246,12 +779,25 @@ else:
 
                 output_capture = StringIO()
                 try:
-                    with contextlib.redirect_stdout(output_capture):
-                        exec_env = {"__name__": "__main__"}
-                        exec(edited_code, exec_env)
+                    # 脚本经 get_client() / exec_env["client"] 发起的查询都被记下，
+                    # 其它会话或同一服务账号下其它程序的作业不会混进来
+                    with bq_client.record_jobs() as run_jobs:
+                        with contextlib.redirect_stdout(output_capture):
+                            exec_env = {
+                                "__name__": "__main__",
+                                "client": bq_client.get_client(client.project),
+                            }
+                            exec(edited_code, exec_env)
 
                     status_placeholder.empty()
                     st.success("✅ 执行完毕")
+                    # 作业对象存进会话，rerun 时导出面板不再调用 get_job
+                    codelab_jobs[file_name] = {}
+                    for job in run_jobs:
+                        if job.state != "DONE":
+                            job.reload()
+                        if job.state == "DONE" and not job.error_result:
+                            codelab_jobs[file_name][job.job_id] = job
                     st.code(
                         output_capture.getvalue() or "> 脚本正常结束", language="text"
                     )
@@ -263,6 +809,20 @@ else:
                         output_capture.getvalue() + f"\n\n[Error]: {e}", language="text"
                     )
 
+        # 4. 导出本次运行的查询结果
+        if codelab_jobs.get(file_name):
+            run_jobs = codelab_jobs[file_name]
+            job_id = st.selectbox(
+                "📦 本次运行的查询作业", list(run_jobs), key=f"export_job_{file_name}"
+            )
+            job = run_jobs[job_id]
+            if job.destination is None:
+                st.caption("该作业没有结果表（DDL / DML / 脚本），无法导出。")
+            else:
+                query = " ".join((job.query or "").split())[:120]
+                st.caption(f"`{job.statement_type}` · {query}")
+                export_panel(f"codelab_{job_id}", job_id, job=job)
+
     # --- Tab 2: 定制化可视化展示 ---
     with tab_viz:
         st.markdown("针对本章节的重点成果展示。")
@@ -278,9 +838,13 @@ else:
                 WHERE state = 'CA'
                 GROUP BY name ORDER BY total_count DESC LIMIT 10
                 """
-                df = client.query(q).to_dataframe()
+                start_query("dd_01", q)
+            result = job_result("dd_01")
+            if result is not None:
+                df, _ = result
                 st.bar_chart(df.set_index("name"))
                 st.dataframe(df)
+                st.caption(frame_size(df))
 
         # 针对 08_机器学习 的特殊展示
         elif "08" in file_name:
@@ -293,7 +857,11 @@ else:
                  FROM `bigquery-public-data.wikipedia.pageviews_2020`
                  WHERE date(datehour) = '2020-01-02' GROUP BY title LIMIT 300))
                 """
-                df_ml = client.query(q).to_dataframe()
+                start_query("dd_08", q)
+            result = job_result("dd_08")
+            if result is not None:
+                df_ml = result[0].copy()
+                st.caption(frame_size(result[0]))
 
                 # 数据清洗
                 df_ml["centroid_id"] = df_ml["centroid_id"].astype(str)
@@ -326,37 +894,42 @@ else:
 
             q_logs = "SELECT event_type, count(*) as c FROM `webeye-internal-test.learning_bq.app_logs` GROUP BY 1"
             if st.button("查看现有的日志分布"):
-                try:
-                    df = client.query(q_logs).to_dataframe()
-                    st.bar_chart(df.set_index("event_type"))
-                except Exception:
-                    st.warning(
-                        "表可能不存在，请先在 'Code Lab' 运行 06 脚本创建并填充数据。"
-                    )
+                start_query("dd_06", q_logs)
+            result = job_result(
+                "dd_06",
+                failure_hint="表可能不存在，请先在 'Code Lab' 运行 06 脚本创建并填充数据。",
+            )
+            if result is not None:
+                st.bar_chart(result[0].set_index("event_type"))
+                st.caption(frame_size(result[0]))
 
         # 针对 07_嵌套数据 的特殊展示
         elif "07" in file_name:
             st.subheader("🧱 嵌套数据 (STRUCT/ARRAY) 展示")
             st.markdown("展示 `UNNEST` 后的扁平化订单数据。")
             if st.button("执行 UNNEST 查询"):
-                try:
-                    q = "SELECT order_id, i.sku, i.quantity FROM `webeye-internal-test.learning_bq.complex_orders`, UNNEST(items) as i LIMIT 10"
-                    df = client.query(q).to_dataframe()
-                    st.table(df)
-                except Exception:
-                    st.warning("表可能不存在，请先在 'Code Lab' 运行 07 脚本。")
+                q = "SELECT order_id, i.sku, i.quantity FROM `webeye-internal-test.learning_bq.complex_orders`, UNNEST(items) as i LIMIT 10"
+                start_query("dd_07", q)
+            result = job_result(
+                "dd_07", failure_hint="表可能不存在，请先在 'Code Lab' 运行 07 脚本。"
+            )
+            if result is not None:
+                st.table(result[0])
+                st.caption(frame_size(result[0]))
 
         # 针对 10_物化视图 的特殊展示
         elif "10" in file_name:
             st.subheader("🚀 物化视图 (Materialized Views) 极致加速")
             st.write("MV 会自动维护预聚合结果。")
             if st.button("查看 MV 聚合结果"):
-                try:
-                    q = "SELECT * FROM `webeye-internal-test.learning_bq.daily_event_stats` LIMIT 10"
-                    df = client.query(q).to_dataframe()
-                    st.line_chart(df.set_index("event_date"))
-                except Exception:
-                    st.warning("物化视图可能不存在，请先运行 10 脚本。")
+                q = "SELECT * FROM `webeye-internal-test.learning_bq.daily_event_stats` LIMIT 10"
+                start_query("dd_10", q)
+            result = job_result(
+                "dd_10", failure_hint="物化视图可能不存在，请先运行 10 脚本。"
+            )
+            if result is not None:
+                st.line_chart(result[0].set_index("event_date"))
+                st.caption(frame_size(result[0]))
 
         # 针对 11_脚本 的特殊展示
         elif "11" in file_name:
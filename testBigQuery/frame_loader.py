@@ -0,0 +1,108 @@
+"""把查询结果（pyarrow.Table）转成占用内存更少的 DataFrame，并报告实际内存占用。
+
+to_dataframe() / to_pandas() 的默认转换里，STRING 列在 pandas 2 中是 Python object
+（每个值一个 str 对象，wikipedia 标题这类列占用是 Arrow 的好几倍），INT64 一律是 int64，
+含 NULL 的整数列还会变成 float64。这里提供三种策略：
+
+- "default"  与 to_pandas() 相同，作为对照
+- "arrow"    所有列都用 pd.ArrowDtype，直接引用 Arrow 缓冲区，几乎不额外占内存
+- "compact"  低基数的字符串列（在整列上等间隔抽取的 SAMPLE_ROWS 行中
+             不同值占比不超过 CATEGORY_RATIO）转为 category，
+             其余字符串列用 pd.ArrowDtype；
+             含 NULL 的整数列用 pandas 的可空整数（Int64）而不是 float64；
+             其他列与默认相同
+
+downcast_ints=True 时 compact 还会把整数列按取值范围降为 int8/16/32（Int8 等）。
+降位后的列做加法、乘法会静默溢出，只适合只读展示（Dashboard 表格），
+load() 给脚本用的结果不降位。
+
+环境变量：
+    BQ_CATEGORY_RATIO   字符串列转为 category 的不同值占比上限，默认 0.5
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+STRATEGIES = ("compact", "arrow", "default")
+CATEGORY_RATIO = float(os.environ.get("BQ_CATEGORY_RATIO", 0.5))
+SAMPLE_ROWS = 10_000
+
+_INT_TYPES = (pa.int8(), pa.int16(), pa.int32(), pa.int64())
+
+
+def _smallest_int(column):
+    """能装下 column 所有值的最小有符号整数类型。"""
+    bounds = pc.min_max(column)
+    low, high = bounds["min"].as_py(), bounds["max"].as_py()
+    if low is None:
+        return pa.int8()
+    for type_ in _INT_TYPES:
+        limits = np.iinfo(type_.to_pandas_dtype())
+        if limits.min <= low and high <= limits.max:
+            return type_
+    return column.type
+
+
+def _sample(column):
+    """在整列上等间隔取最多 SAMPLE_ROWS 行；排序或分簇的结果只看开头会有偏差。"""
+    step = max(len(column) // SAMPLE_ROWS, 1)
+    if step == 1:
+        return column
+    return column.take(pa.array(np.arange(0, len(column), step)))
+
+
+def _low_cardinality(column):
+    # 先在样本上数不同值：高基数列直接用 Arrow 字符串，不必为整列建一张和列差不多大的
+    # 哈希表；样本判定为低基数后才对整列 dictionary_encode，此时哈希表只有不同值那么大
+    sample = _sample(column)
+    distinct = pc.count_distinct(sample).as_py()
+    return len(sample) > 0 and distinct <= CATEGORY_RATIO * len(sample)
+
+
+def _compact_column(column, downcast_ints=False):
+    if pa.types.is_string(column.type) or pa.types.is_large_string(column.type):
+        if _low_cardinality(column):
+            series = column.dictionary_encode().to_pandas()
+            # 样本之外不同值更多时（样本没有代表性）仍退回 Arrow 字符串
+            if len(series.cat.categories) <= CATEGORY_RATIO * len(column):
+                return series
+        return column.to_pandas(types_mapper=pd.ArrowDtype)
+    if pa.types.is_signed_integer(column.type):
+        if downcast_ints:
+            column = column.cast(_smallest_int(column))
+        if column.null_count:
+            nullable = pd.api.types.pandas_dtype(f"Int{column.type.bit_width}")
+            return column.to_pandas(types_mapper={column.type: nullable}.get)
+        return column.to_pandas()
+    return column.to_pandas()
+
+
+def to_frame(table, strategy="compact", downcast_ints=False):
+    """按 strategy 把 pyarrow.Table 转成 DataFrame；downcast_ints 只用于只读展示。"""
+    if strategy == "default":
+        return table.to_pandas()
+    if strategy == "arrow":
+        return table.to_pandas(types_mapper=pd.ArrowDtype)
+    if strategy == "compact":
+        return pd.DataFrame(
+            {
+                name: _compact_column(col, downcast_ints)
+                for name, col in zip(table.column_names, table.columns)
+            }
+        )
+    raise ValueError(f"未知的转换策略: {strategy}（可选 {', '.join(STRATEGIES)}）")
+
+
+def load(query_job, bqstorage_client=None, strategy="compact"):
+    """query_job.to_dataframe() 的替代：先取 Arrow，再按 strategy 转换，整数不降位。"""
+    table = query_job.to_arrow(bqstorage_client=bqstorage_client)
+    return to_frame(table, strategy)
+
+
+def memory_bytes(df):
+    """DataFrame 实际占用的内存（含 object 列里每个 Python 对象）。"""
+    return int(df.memory_usage(deep=True).sum())
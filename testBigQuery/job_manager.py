@@ -0,0 +1,116 @@
+"""Dashboard 查询的后台作业管理：提交后立即返回，按退避间隔轮询状态，可随时取消。
+
+client.query() 只负责提交作业（jobs.insert）；真正阻塞的是 result() / to_dataframe()。
+这里在 Streamlit 会话状态里只记录作业 ID 和最近一次看到的状态，
+每次轮询用 get_job 取最新状态，长查询不再占住脚本线程；完成后再分批下载结果。
+"""
+
+import time
+
+
+class JobManager:
+    """按名字（如 "playground"、"dd_01"）跟踪查询作业。
+
+    state 是会话里的一个 dict（st.session_state 中），只存作业 ID 等可序列化的值，
+    每次 rerun 用同一个 dict 重新构造 JobManager 即可。
+    """
+
+    def __init__(self, client, state, initial_delay=0.5, max_delay=5.0, multiplier=1.6):
+        self._client = client
+        self._state = state
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+
+    def submit(self, name, sql, job_config=None):
+        """提交作业并立即返回；同名的旧作业不再跟踪（不会被取消）。"""
+        job = self._client.query(sql, job_config=job_config)
+        now = time.time()
+        entry = self._state[name] = {
+            "job_id": job.job_id,
+            "location": job.location,
+            "sql": sql,
+            "state": job.state or "PENDING",
+            "submitted_at": now,
+            "ended_at": None,
+            "bytes_processed": None,
+            "error": None,
+            "cancelled": False,
+            "delay": self.initial_delay,
+            "next_poll": now + self.initial_delay,
+        }
+        if job.state == "DONE":
+            # 命中 BigQuery 缓存或很快的查询在 insert 时就已完成，之后不会再轮询
+            self._update(entry, job)
+        return entry
+
+    def get(self, name):
+        return self._state.get(name)
+
+    def forget(self, name):
+        self._state.pop(name, None)
+
+    def job(self, name):
+        entry = self._state[name]
+        return self._client.get_job(entry["job_id"], location=entry["location"])
+
+    def poll(self, name, force=False):
+        """到了下次轮询时间才访问 BigQuery；间隔按 multiplier 递增，最长 max_delay。"""
+        entry = self._state.get(name)
+        if entry is None or entry["state"] == "DONE":
+            return entry
+        if not force and time.time() < entry["next_poll"]:
+            return entry
+        self._update(entry, self.job(name))
+        entry["delay"] = min(entry["delay"] * self.multiplier, self.max_delay)
+        entry["next_poll"] = time.time() + entry["delay"]
+        return entry
+
+    @staticmethod
+    def _update(entry, job):
+        """把作业的最新状态、扫描量、结束时间和错误写进 entry。"""
+        entry["state"] = job.state
+        entry["bytes_processed"] = (
+            job.total_bytes_processed or job.estimated_bytes_processed
+        )
+        if job.state == "DONE":
+            entry["ended_at"] = job.ended.timestamp() if job.ended else time.time()
+            if job.error_result:
+                entry["error"] = job.error_result.get("message") or str(
+                    job.error_result
+                )
+
+    def elapsed(self, name):
+        entry = self._state[name]
+        return (entry["ended_at"] or time.time()) - entry["submitted_at"]
+
+    def cancel(self, name):
+        """请求取消；BigQuery 异步停止作业，之后的轮询会看到 DONE + 错误信息。"""
+        entry = self._state.get(name)
+        if entry is None or entry["state"] == "DONE":
+            return
+        self._client.cancel_job(entry["job_id"], location=entry["location"])
+        entry["cancelled"] = True
+        entry["delay"] = self.initial_delay
+        entry["next_poll"] = time.time() + self.initial_delay
+
+    def fetch_arrow(self, name, bqstorage_client=None, on_progress=None):
+        """分批下载已完成作业的结果，返回 (pyarrow.Table, job)。
+
+        每收到一批调用 on_progress(已下载行数, 总行数)，页面可以边下载边显示进度。
+        """
+        import pyarrow as pa
+
+        job = self.job(name)
+        rows = job.result()
+        batches = []
+        loaded = 0
+        for batch in rows.to_arrow_iterable(bqstorage_client=bqstorage_client):
+            batches.append(batch)
+            loaded += batch.num_rows
+            if on_progress is not None:
+                on_progress(loaded, rows.total_rows)
+        if not batches:
+            # 没有结果行（如 DDL / DML），取一个带 schema 的空表
+            return job.to_arrow(bqstorage_client=bqstorage_client), job
+        return pa.Table.from_batches(batches), job
@@ -0,0 +1,77 @@
+"""按页读取查询结果，内存里只保留有限几页，浏览上百万行时内存占用不随结果大小增长。
+
+每个查询作业的结果都写在一张目的表里（未指定时是 BigQuery 自动建的匿名临时表）。
+用 list_rows(start_index=..., max_results=...) 直接读任意一页，不需要先下载前面的行。
+总行数、schema 来自目的表的元数据（get_table，只在构造时调用一次）。
+
+命中本地结果缓存时，结果是内存映射的 Arrow 表，用 slice 取页（零拷贝）。
+"""
+
+import collections
+import math
+
+
+class PagedResult:
+    """结果的分页视图；fetch(start, count) 返回一页 pyarrow.Table。
+
+    最近访问的 max_pages 页留在内存里（LRU），来回翻页不重复请求。
+    """
+
+    def __init__(self, fetch, total_rows, page_size=500, max_pages=8):
+        self._fetch = fetch
+        self.total_rows = total_rows
+        self.max_pages = max_pages
+        self._pages = collections.OrderedDict()
+        self.page_size = page_size
+
+    @classmethod
+    def from_job(cls, client, job, **kwargs):
+        """从已完成作业的目的表分页读取；没有目的表（DDL、多语句脚本）时返回 None。"""
+        if job.destination is None:
+            return None
+        table = client.get_table(job.destination)
+
+        def fetch(start, count):
+            rows = client.list_rows(
+                table, start_index=start, max_results=count, page_size=count
+            )
+            # 带 max_results 时不走 Storage API（它只能整表读取），一页就是一次 REST 调用
+            return rows.to_arrow(create_bqstorage_client=False)
+
+        return cls(fetch, table.num_rows or 0, **kwargs)
+
+    @classmethod
+    def from_arrow(cls, table, **kwargs):
+        return cls(
+            lambda start, count: table.slice(start, count), table.num_rows, **kwargs
+        )
+
+    @property
+    def page_size(self):
+        return self._page_size
+
+    @page_size.setter
+    def page_size(self, value):
+        self._page_size = max(int(value), 1)
+        self._pages.clear()
+
+    @property
+    def page_count(self):
+        return max(math.ceil(self.total_rows / self._page_size), 1)
+
+    @property
+    def cached_pages(self):
+        return list(self._pages)
+
+    def page(self, index):
+        """第 index 页（从 0 开始）的 pyarrow.Table。"""
+        index = min(max(index, 0), self.page_count - 1)
+        table = self._pages.get(index)
+        if table is None:
+            table = self._fetch(index * self._page_size, self._page_size)
+            self._pages[index] = table
+            while len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+        else:
+            self._pages.move_to_end(index)
+        return table
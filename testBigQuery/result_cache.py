@@ -0,0 +1,265 @@
+"""查询结果的本地磁盘缓存：按“规范化 SQL + 参数 + 作业配置”存为 Arrow IPC 文件。
+
+Dashboard 里固定的演示查询（usa_names、wikipedia pageviews 等）每次点击、每次 rerun
+都会重新执行并重新下载；命中缓存时直接内存映射本地文件，不发任何网络请求。
+
+- 每个条目有自己的 TTL（过期时间写在文件的 schema metadata 里）
+- 总大小超过上限时按最近访问时间（文件 mtime，命中时更新）淘汰最旧的条目
+- 只缓存 SELECT 查询的结果，DDL / DML / 脚本不缓存
+- 含非确定函数（CURRENT_*()、RAND() 等）的 SQL、读取 VOLATILE_DATASETS 中的表
+  （教程脚本会反复重建的 learning_bq）的 SQL 不缓存
+- 写入先落临时文件再 os.replace，多个会话并发读写不会读到半个文件
+
+环境变量：
+    BQ_RESULT_CACHE_DIR     缓存目录，默认 ~/.cache/testbigquery/results
+    BQ_RESULT_CACHE_BYTES   总大小上限，默认 512 MiB
+    BQ_RESULT_CACHE_TTL     默认 TTL（秒），默认 3600
+    BQ_RESULT_CACHE_SKIP_DATASETS   不缓存的数据集（逗号分隔），默认 learning_bq
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+
+import pyarrow as pa
+
+CACHE_DIR = os.environ.get(
+    "BQ_RESULT_CACHE_DIR",
+    os.path.join(
+        os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+        "testbigquery",
+        "results",
+    ),
+)
+MAX_BYTES = int(os.environ.get("BQ_RESULT_CACHE_BYTES", 512 * 1024 * 1024))
+DEFAULT_TTL = float(os.environ.get("BQ_RESULT_CACHE_TTL", 3600))
+_SKIP_DATASETS = os.environ.get("BQ_RESULT_CACHE_SKIP_DATASETS", "learning_bq")
+VOLATILE_DATASETS = tuple(n.strip() for n in _SKIP_DATASETS.split(",") if n.strip())
+
+_SUFFIX = ".arrow"
+_EXPIRES = b"result_cache.expires_at"
+# 引号 / 反引号内的内容原样保留，其余部分的连续空白折叠成一个空格
+_QUOTED = re.compile(r"""('(?:\\.|[^'\\])*'|"(?:\\.|[^"\\])*"|`[^`]*`)""", re.S)
+_SPACE = re.compile(r"\s+")
+# 每次执行结果都可能不同的函数；CURRENT_DATE 等可以不带括号调用
+_NONDETERMINISTIC = re.compile(
+    r"\b(?:CURRENT_(?:DATE|DATETIME|TIME|TIMESTAMP|USER)|SESSION_USER|RAND"
+    r"|GENERATE_UUID|NOW)\b",
+    re.IGNORECASE,
+)
+# 参与缓存 key 的作业配置：同一 SQL 在不同配置下结果不同
+_CONFIG_FIELDS = ("default_dataset", "use_legacy_sql", "connection_properties")
+
+
+def normalize_sql(sql):
+    """折叠字面量之外的空白、去掉结尾分号：只有缩进和换行不同的 SQL 得到同一个 key。"""
+    parts = _QUOTED.split(sql)
+    for i in range(0, len(parts), 2):
+        parts[i] = _SPACE.sub(" ", parts[i])
+    return "".join(parts).strip().rstrip(";").rstrip()
+
+
+def _param_repr(param):
+    to_api_repr = getattr(param, "to_api_repr", None)
+    return to_api_repr() if to_api_repr is not None else repr(param)
+
+
+def cacheable(sql):
+    """SQL 的结果能否缓存：不含非确定函数，也不读取 VOLATILE_DATASETS 中的表。"""
+    code = "".join(_QUOTED.split(sql)[::2])
+    if _NONDETERMINISTIC.search(code):
+        return False
+    tables = sql.replace("`", "").lower()
+    return not any(
+        re.search(rf"(?<![\w-]){re.escape(dataset.lower())}\.\w", tables)
+        for dataset in VOLATILE_DATASETS
+    )
+
+
+def config_repr(job_config):
+    """job_config（QueryJobConfig 或已执行的 QueryJob）中影响结果的字段。"""
+    config = {}
+    for field in _CONFIG_FIELDS:
+        value = getattr(job_config, field, None)
+        if field == "use_legacy_sql":
+            # 未设置（None）与 False 都是标准 SQL；执行完的作业上读到的是 False
+            value = bool(value)
+        elif isinstance(value, (list, tuple)):
+            value = [_param_repr(v) for v in value] or None
+        elif value is not None:
+            value = _param_repr(value)
+        config[field] = value
+    return config
+
+
+def cache_key(sql, params=None, project=None, config=None):
+    """规范化 SQL + 查询参数 + 项目 + 作业配置（见 config_repr）的 SHA-256。"""
+    payload = {
+        "sql": normalize_sql(sql),
+        "params": [_param_repr(p) for p in params or ()],
+        "project": project,
+        "config": config or config_repr(None),
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class ResultCache:
+    """Arrow IPC 文件组成的目录缓存，带 TTL 和总大小上限（LRU 淘汰）。"""
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=MAX_BYTES, ttl=DEFAULT_TTL):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + _SUFFIX)
+
+    def get(self, key):
+        """返回内存映射的 pyarrow.Table；不存在或已过期时返回 None。"""
+        path = self._path(key)
+        try:
+            source = pa.memory_map(path)
+        except FileNotFoundError:
+            return None
+        try:
+            reader = pa.ipc.open_file(source)
+            expires_at = float((reader.schema.metadata or {}).get(_EXPIRES, 0))
+            if expires_at <= time.time():
+                self._remove(path)
+                return None
+            # 缓冲区直接指向映射的文件页，不拷贝；文件被淘汰删除后映射依然有效
+            table = reader.read_all()
+        except (pa.ArrowInvalid, OSError, ValueError):
+            # 损坏或写到一半的文件（进程被杀）直接丢弃
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return table.replace_schema_metadata(_strip(table.schema.metadata))
+
+    def put(self, key, table, ttl=None):
+        """写入一个结果；超过总大小上限时淘汰最久未访问的条目。"""
+        ttl = self.ttl if ttl is None else ttl
+        metadata = dict(table.schema.metadata or {})
+        metadata[_EXPIRES] = str(time.time() + ttl).encode()
+        table = table.replace_schema_metadata(metadata)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                with pa.ipc.new_file(f, table.schema) as writer:
+                    writer.write_table(table)
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            self._remove(tmp)
+            raise
+        self.evict()
+
+    def evict(self):
+        """删除过期条目，再按 mtime 从旧到新删除，直到总大小不超过上限。"""
+        with self._lock:
+            entries = []
+            now = time.time()
+            for name in os.listdir(self.directory):
+                if not name.endswith(_SUFFIX):
+                    continue
+                path = os.path.join(self.directory, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+            entries.sort()
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if total <= self.max_bytes and not self._expired(path, now):
+                    continue
+                self._remove(path)
+                total -= size
+
+    def _expired(self, path, now):
+        try:
+            with pa.memory_map(path) as source:
+                metadata = pa.ipc.open_file(source).schema.metadata or {}
+            return float(metadata.get(_EXPIRES, 0)) <= now
+        except (pa.ArrowInvalid, OSError, ValueError):
+            return True
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith(_SUFFIX):
+                self._remove(os.path.join(self.directory, name))
+
+    def stats(self):
+        """(条目数, 总字节数)。"""
+        count = total = 0
+        for name in os.listdir(self.directory):
+            if name.endswith(_SUFFIX):
+                try:
+                    total += os.path.getsize(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    continue
+                count += 1
+        return count, total
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _strip(metadata):
+    if not metadata:
+        return metadata
+    return {k: v for k, v in metadata.items() if k != _EXPIRES} or None
+
+
+def _key(client, sql, job_config):
+    params = getattr(job_config, "query_parameters", None)
+    return cache_key(sql, params, client.project, config_repr(job_config))
+
+
+def lookup(client, sql, job_config=None, cache=None):
+    """只查缓存、不执行查询；未命中或 SQL 不可缓存时返回 None。"""
+    if cache is None or not cacheable(sql):
+        return None
+    return cache.get(_key(client, sql, job_config))
+
+
+def save(client, sql, table, query_job, job_config=None, cache=None, ttl=None):
+    """把已执行完的查询结果写入缓存；非 SELECT 语句和不可缓存的 SQL 不缓存。"""
+    if cache is not None and query_job.statement_type == "SELECT" and cacheable(sql):
+        cache.put(_key(client, sql, job_config), table, ttl)
+
+
+def query(
+    client,
+    sql,
+    job_config=None,
+    cache=None,
+    use_cache=True,
+    ttl=None,
+    bqstorage_client=None,
+):
+    """执行查询并返回 (pyarrow.Table, query_job)；命中缓存时 query_job 为 None。
+
+    use_cache=False 时跳过读取，但 SELECT 结果仍会写回缓存，下次即可命中。
+    """
+    if use_cache:
+        table = lookup(client, sql, job_config, cache)
+        if table is not None:
+            return table, None
+    query_job = client.query(sql, job_config=job_config)
+    table = query_job.to_arrow(bqstorage_client=bqstorage_client)
+    save(client, sql, table, query_job, job_config, cache, ttl)
+    return table, query_job
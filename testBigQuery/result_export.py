@@ -0,0 +1,101 @@
+"""把查询结果流式导出为本地 Parquet / CSV 文件，内存里同一时间只有一批数据。
+
+to_dataframe() 会先把整个结果载入内存，再由调用方另存；这里改为逐批读取
+（to_arrow_iterable，优先走 Storage API），每收到一个 RecordBatch 就写入文件并释放。
+下载只用一个 stream、队列长度为 1，峰值内存约为一批数据，与结果总大小无关。
+
+- Parquet 每批写成一个 row group（zstd 压缩）
+- CSV 不支持 STRUCT / ARRAY 列，遇到时 pyarrow 直接报错
+- 先写临时文件再 os.replace，导出中途失败不会留下半个文件
+
+环境变量：
+    BQ_EXPORT_DIR   默认导出目录，默认 ~/Downloads/testbigquery
+"""
+
+import os
+import tempfile
+
+import pyarrow as pa
+
+EXPORT_DIR = os.environ.get(
+    "BQ_EXPORT_DIR", os.path.join(os.path.expanduser("~/Downloads"), "testbigquery")
+)
+FORMATS = {"parquet": ".parquet", "csv": ".csv"}
+
+
+def default_path(name, fmt, directory=EXPORT_DIR):
+    return os.path.join(directory, name + FORMATS[fmt])
+
+
+def _open_writer(sink, schema, fmt):
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        return pq.ParquetWriter(sink, schema, compression="zstd")
+    if fmt == "csv":
+        import pyarrow.csv as pa_csv
+
+        return pa_csv.CSVWriter(sink, schema)
+    raise ValueError(f"不支持的导出格式: {fmt}（可选 {', '.join(FORMATS)}）")
+
+
+def write_batches(
+    batches, schema, path, fmt="parquet", total_rows=None, on_progress=None
+):
+    """把 RecordBatch 迭代器逐批写入 path，返回 (行数, 文件字节数)。
+
+    schema 为 None 时用第一批的 schema；没有任何批次时需要提供 schema（写一个空文件）。
+    每写完一批调用 on_progress(已写行数, 总行数, 已写字节数)。
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    os.close(fd)
+    rows = 0
+    try:
+        with pa.OSFile(tmp, "wb") as sink:
+            writer = None if schema is None else _open_writer(sink, schema, fmt)
+            for batch in batches:
+                if writer is None:
+                    writer = _open_writer(sink, batch.schema, fmt)
+                writer.write_batch(batch)
+                rows += batch.num_rows
+                if on_progress is not None:
+                    on_progress(rows, total_rows, sink.tell())
+            if writer is None:
+                raise ValueError("结果为空且没有 schema，无法导出")
+            writer.close()
+            size = sink.tell()
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+    return rows, size
+
+
+def export_job(job, path, fmt="parquet", bqstorage_client=None, on_progress=None):
+    """导出已完成查询作业的结果，返回 (行数, 文件字节数)。"""
+    rows = job.result()
+    batches = rows.to_arrow_iterable(
+        bqstorage_client=bqstorage_client, max_queue_size=1, max_stream_count=1
+    )
+    first = next(iter(batches), None)
+    if first is None:
+        # 没有结果行，取一个带 schema 的空表写出表头 / 空 Parquet 文件
+        schema = job.to_arrow(create_bqstorage_client=False).schema
+        return write_batches([], schema, path, fmt, 0, on_progress)
+
+    def chained():
+        yield first
+        yield from batches
+
+    return write_batches(chained(), None, path, fmt, rows.total_rows, on_progress)
+
+
+def export_table(table, path, fmt="parquet", on_progress=None, batch_rows=65536):
+    """导出一个 pyarrow.Table（如内存映射的缓存结果），按 batch_rows 行一批写入。"""
+    batches = table.to_batches(max_chunksize=batch_rows)
+    return write_batches(batches, table.schema, path, fmt, table.num_rows, on_progress)
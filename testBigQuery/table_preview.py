@@ -0,0 +1,97 @@
+"""免费的表预览：用 list_rows（tabledata.list）读前 N 行，不跑查询作业。
+
+`SELECT * FROM t LIMIT 20` 是一个查询作业，LIMIT 不减少扫描量，
+BigQuery 仍按所选列的全表字节数计费。list_rows 直接读表的存储，只返回 selected_fields
+中的列，不产生查询作业，也不计费。
+
+- 只能预览普通表（TABLE）；视图、物化视图、外部表没有可直接读取的存储
+- parse() 识别“单表、无 WHERE / ORDER BY 等子句”的 SELECT [* | 列...] ... LIMIT n，
+  Playground 据此提示改用预览
+"""
+
+import collections
+import re
+
+from result_cache import normalize_sql
+
+MAX_PREVIEW_ROWS = 10_000
+
+Preview = collections.namedtuple("Preview", "table columns limit")
+
+_IDENT = r"`?[A-Za-z_][\w]*`?"
+_PLAIN_SELECT = re.compile(
+    r"^SELECT\s+(?P<columns>\*|{ident}(?:\s*,\s*{ident})*)"
+    r"\s+FROM\s+(?P<table>`[^`]+`(?:\.`[^`]+`)*|[\w.:-]+)"
+    r"(?:\s+(?:AS\s+)?(?!LIMIT\b)\w+)?"
+    r"\s+LIMIT\s+(?P<limit>\d+)$".format(ident=_IDENT),
+    re.IGNORECASE,
+)
+
+
+def parse(sql):
+    """单表的 SELECT [* | 列...] FROM t LIMIT n 返回 Preview，其他 SQL 返回 None。
+
+    columns 为 None 表示所有列；LIMIT 超过 MAX_PREVIEW_ROWS 时也返回 None。
+    """
+    match = _PLAIN_SELECT.match(normalize_sql(sql))
+    if match is None:
+        return None
+    limit = int(match["limit"])
+    if limit > MAX_PREVIEW_ROWS:
+        return None
+    table = match["table"].replace("`", "").replace(":", ".")
+    if not 2 <= len(table.split(".")) <= 3:
+        return None
+    columns = None
+    if match["columns"] != "*":
+        columns = [c.strip().strip("`") for c in match["columns"].split(",")]
+    return Preview(table, columns, limit)
+
+
+def list_datasets(client, project=None):
+    return sorted(d.dataset_id for d in client.list_datasets(project))
+
+
+def list_tables(client, dataset):
+    """dataset 中可以预览的表（只含普通表）。"""
+    tables = client.list_tables(dataset)
+    return sorted(t.table_id for t in tables if t.table_type == "TABLE")
+
+
+def selected_fields(table, columns=None):
+    """按列名（不区分大小写）从表的 schema 中取 SchemaField；未知列抛 ValueError。"""
+    if not columns:
+        return list(table.schema)
+    fields = {field.name.lower(): field for field in table.schema}
+    missing = [c for c in columns if c.lower() not in fields]
+    if missing:
+        raise ValueError(f"表 {table.table_id} 中没有列: {', '.join(missing)}")
+    return [fields[c.lower()] for c in columns]
+
+
+def check(client, preview):
+    """预览 SQL 对应的表能否用 list_rows 读取，返回 google.cloud.bigquery.Table。
+
+    表不存在、不是普通表或列名不对时抛异常；调用方据此决定是否提示改用预览。
+    """
+    table = client.get_table(preview.table)
+    if table.table_type != "TABLE":
+        raise ValueError(f"{preview.table} 是 {table.table_type}，只能预览普通表")
+    selected_fields(table, preview.columns)
+    return table
+
+
+def preview(client, table, columns=None, max_results=20):
+    """读取 table 前 max_results 行的 columns 列，返回 pyarrow.Table。
+
+    table 可以是表名或 get_table 返回的 Table（避免再取一次 schema）。
+    """
+    if isinstance(table, str):
+        table = client.get_table(table)
+    rows = client.list_rows(
+        table,
+        selected_fields=selected_fields(table, columns),
+        max_results=min(max_results, MAX_PREVIEW_ROWS),
+    )
+    # 带 max_results 时不会走 Storage API，不必创建 bqstorage 客户端
+    return rows.to_arrow(create_bqstorage_client=False)
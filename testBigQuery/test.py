@@ -1,8 +1,8 @@
-from google.cloud import bigquery
+from bq_client import get_bqstorage_client, get_client
 
 # 初始化客户端
-# 如果你已经用 gcloud 设置了默认项目，这里可以不传 project 参数
-client = bigquery.Client(project="webeye-internal-test")
+# 进程内共享一个客户端（见 bq_client.py），项目由 BQ_PROJECT_ID 指定
+client = get_client()
 
 # 编写 SQL (推荐使用标准 SQL)
 query = """
@@ -28,7 +28,7 @@ query = """
 
 # B. 直接转换为 Pandas DataFrame (推荐)
 # 如果你要处理数据，这种方式最高效。
-df = client.query(query).to_dataframe()
+df = client.query(query).to_dataframe(bqstorage_client=get_bqstorage_client())
 
 # 现在你可以像操作普通 Pandas 数据一样操作它
 print(df.head())